@@ -0,0 +1,255 @@
+import os
+import sys
+import json
+import time
+import argparse
+import logging
+import threading
+import multiprocessing
+from typing import Any
+from urllib.parse import urlparse
+from urllib.request import urlopen
+
+from src.comicbagi_scrap.bot import Bot
+from src.comicbagi_scrap.cache import Cache
+from src.comicbagi_scrap.decode import Decoder
+from src.comicbagi_scrap.ratelimit import RateLimiter
+from src.comicbagi_scrap.transport import Transport
+from src.comicbagi_scrap.bot_mangadex import BotMangaDex
+
+from .mock import serve
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'api')
+
+class Notes:
+    def __init__(self):
+        self.manga = 0
+        self.chapter = 0
+
+        self.lock = threading.Lock()
+
+    def record(self, action: str, **fields: Any):
+        with self.lock:
+            if action == 'manga':
+                self.manga += 1
+            elif action == 'chapter':
+                self.chapter += 1
+
+class ComicKing:
+    def get_or_add_comic_complete(self, mal_id: int):
+        return f'bench-{mal_id - 1}'
+
+class Clock:
+    def __init__(self):
+        self.slept = 0.0
+        self.waited = 0.0
+        self.requests = 0
+
+        self.lock = threading.Lock()
+
+    def install(self, transport: Transport):
+        sleep = time.sleep
+        urlopen = transport.pool_manager.urlopen
+
+        def timed_sleep(seconds: float):
+            start = time.perf_counter()
+            try:
+                sleep(seconds)
+            finally:
+                with self.lock:
+                    self.slept += time.perf_counter() - start
+
+        def timed_urlopen(*args: Any, **kwargs: Any):
+            start = time.perf_counter()
+            try:
+                return urlopen(*args, **kwargs)
+            finally:
+                with self.lock:
+                    self.waited += time.perf_counter() - start
+                    self.requests += 1
+
+        time.sleep = timed_sleep
+        transport.pool_manager.urlopen = timed_urlopen
+
+        return sleep
+
+def run(mode: str, args: argparse.Namespace) -> dict[str, Any]:
+    connection, child_connection = multiprocessing.Pipe()
+
+    # Servers get their own process so CPU time below belongs to the scraper alone
+    server = multiprocessing.Process(target=serve, args=({
+        'size': args.size,
+        'chapters': args.chapters,
+        'existing': args.existing,
+        'fresh_chapters': args.fresh_chapters,
+        'unsupported': args.unsupported,
+        'seed': args.seed,
+        'spec_comicbagi': os.path.join(SPEC_PATH, 'openapi-comicbagi.yaml'),
+        'spec_mangadex': os.path.join(SPEC_PATH, 'openapi-mangadex.yaml'),
+        'latency_comicbagi': args.latency_comicbagi,
+        'latency_mangadex': args.latency_mangadex,
+        'latency_oauth': args.latency_oauth,
+        'rate_comicbagi': args.server_rate_comicbagi,
+        'rate_mangadex': args.server_rate_mangadex,
+        'error_rate': args.error_rate
+    }, child_connection), daemon=True)
+    server.start()
+
+    urls: dict[str, str] = connection.recv()
+
+    logger = logging.getLogger('bench')
+    notes = Notes()
+
+    transport = Transport(args.pool_size)
+
+    rate_limiter = RateLimiter()
+    rate_limiter.add(urlparse(urls['comicbagi']).netloc, args.client_rate_comicbagi)
+    rate_limiter.add('api.mangadex.org', args.client_rate_mangadex)
+
+    cache = Cache(args.cache) if args.cache else None
+
+    clock = Clock()
+    sleep = clock.install(transport)
+
+    try:
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+
+        bot = Bot(
+            urls['comicbagi'],
+            oauth_issuer=urls['oauth'],
+            oauth_client_id='bench',
+            oauth_client_secret='bench',
+            oauth_audience='bench',
+            logger=logger,
+            audit_log=notes, # type: ignore[arg-type]
+            cache=cache,
+            rate_limiter=rate_limiter,
+            transport=transport,
+            decoder=Decoder() if args.fast_decode else None
+        )
+        bot.load(True)
+
+        bot_mangadex = BotMangaDex(
+            bot,
+            comicking_jikan_bot=ComicKing(), # type: ignore[arg-type]
+            logger=logger
+        )
+        bot_mangadex.client.configuration.host = urls['mangadex']
+        bot_mangadex.process(
+            mode,
+            args.max_new_comic,
+            args.max_new_comic_chapter,
+            args.engine,
+            args.workers
+        )
+
+        wall = time.perf_counter() - started
+        cpu = time.process_time() - started_cpu
+    finally:
+        time.sleep = sleep
+
+        if cache:
+            cache.close()
+
+    services: dict[str, Any] = {}
+    for name, url in urls.items():
+        parts = urlparse(url)
+        with urlopen(f'{parts.scheme}://{parts.netloc}/__bench/stats') as response:
+            services[name] = json.loads(response.read())
+
+    connection.send(None)
+    server.join(5)
+
+    requests = sum(sum(service['requests'].values()) for service in services.values())
+
+    return {
+        'mode': mode,
+        'engine': args.engine,
+        'workers': args.workers,
+        'size': args.size,
+        'chapters': args.chapters,
+        'wall': wall,
+        'cpu': cpu,
+        'sleeping': clock.slept,
+        'rate_limit_sleeping': rate_limiter.slept(),
+        'io': clock.waited,
+        'manga': notes.manga,
+        'chapter': notes.chapter,
+        'requests': requests,
+        'requests_per_manga': requests / notes.manga if notes.manga else None,
+        'requests_per_chapter': requests / notes.chapter if notes.chapter else None,
+        'services': services
+    }
+
+def report(result: dict[str, Any]):
+    print(f'# {result["mode"]} ({result["engine"]}, {result["workers"]} workers), '
+          f'{result["size"]} manga x {result["chapters"]} chapters')
+    print(f'wall      {result["wall"]:10.3f} s')
+    print(f'cpu       {result["cpu"]:10.3f} s')
+    print(f'sleeping  {result["sleeping"]:10.3f} s (rate limit {result["rate_limit_sleeping"]:.3f} s)')
+    print(f'io        {result["io"]:10.3f} s')
+    if result['engine'] == 'sync':
+        print(f'other     {max(0.0, result["wall"] - result["sleeping"] - result["io"]):10.3f} s')
+    else:
+        print('          (concurrent engine, sleeping and io are summed over workers)')
+    print(f'entities  {result["manga"]} manga, {result["chapter"]} chapters')
+    print(f'requests  {result["requests"]}', end='')
+    if result['requests_per_manga']:
+        print(f', {result["requests_per_manga"]:.2f} per manga', end='')
+    if result['requests_per_chapter']:
+        print(f', {result["requests_per_chapter"]:.2f} per chapter', end='')
+    print()
+
+    for name, service in result['services'].items():
+        statuses = ' '.join(f'{k}:{v}' for k, v in sorted(service['statuses'].items()))
+        print(f'  {name} [{statuses}]')
+        for operation_id, count in sorted(service['requests'].items(), key=lambda item: -item[1]):
+            print(f'    {operation_id:32} {count}')
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench')
+    parser.add_argument('--mode', nargs='+', default=['comic', 'comic-chapter'],
+                        choices=['comic', 'comic-chapter', 'incremental'])
+    parser.add_argument('--engine', default='sync', choices=['sync', 'async', 'thread'])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--size', type=int, default=100, help='synthetic manga in the catalogue')
+    parser.add_argument('--chapters', type=int, default=5, help='chapters per manga')
+    parser.add_argument('--existing', type=float, default=0.9, help='share of manga already in ComicBagi')
+    parser.add_argument('--fresh-chapters', type=int, default=1, help='latest chapters missing from existing comics')
+    parser.add_argument('--unsupported', type=float, default=0.1, help='share of manga in an unsupported language')
+    parser.add_argument('--latency-comicbagi', type=float, default=0.005)
+    parser.add_argument('--latency-mangadex', type=float, default=0.02)
+    parser.add_argument('--latency-oauth', type=float, default=0.05)
+    parser.add_argument('--server-rate-comicbagi', type=float, default=0, help='requests per second, 0 for none')
+    parser.add_argument('--server-rate-mangadex', type=float, default=0, help='requests per second, 0 for none')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with 503')
+    parser.add_argument('--client-rate-comicbagi', type=float, default=1000)
+    parser.add_argument('--client-rate-mangadex', type=float, default=1000)
+    parser.add_argument('--pool-size', type=int, default=10)
+    parser.add_argument('--max-new-comic', type=int, default=0)
+    parser.add_argument('--max-new-comic-chapter', type=int, default=10)
+    parser.add_argument('--fast-decode', action='store_true', help='read list responses into compact records')
+    parser.add_argument('--cache', help='existence cache file, fresh runs need a fresh file')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', help='write the results to this file as well')
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = []
+    for mode in args.mode:
+        result = run(mode, args)
+        report(result)
+
+        results.append(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,929 @@
+import re
+import gzip
+import calendar
+import json
+import time
+import uuid
+import random
+import threading
+import yaml
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing.connection import Connection
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlsplit
+
+EPOCH = 1577836800
+TIMESTAMP = '2020-01-01T00:00:00+00:00'
+
+KIND_MANGA = 1
+KIND_CHAPTER = 2
+
+Response = tuple[int, Any, dict[str, str]]
+
+def timestamp(seconds: float):
+    return time.strftime('%Y-%m-%dT%H:%M:%S+00:00', time.gmtime(seconds))
+
+def since(value: str | None):
+    if not value:
+        return None
+
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+
+class Limit:
+    def __init__(self, rate: float, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+        self.lock = threading.Lock()
+
+    def take(self) -> tuple[bool, float, int]:
+        with self.lock:
+            now = time.monotonic()
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens < 1:
+                return False, (1 - self.tokens) / self.rate, 0
+
+            self.tokens -= 1
+
+            return True, 0.0, int(self.tokens)
+
+class Service:
+    def __init__(
+        self,
+        name: str,
+        spec: str | None = None,
+        latency: float = 0,
+        rate: float = 0,
+        error_rate: float = 0,
+        seed: int = 0
+    ):
+        self.name = name
+        self.base_path = ''
+        self.latency = latency
+        self.limit = Limit(rate) if rate else None
+        self.error_rate = error_rate
+
+        self.random = random.Random(seed)
+
+        self.routes: list[tuple[str, re.Pattern[str], str]] = []
+        self.handlers: dict[str, Callable[..., Response]] = {}
+
+        self.requests: Counter[str] = Counter()
+        self.statuses: Counter[int] = Counter()
+
+        self.lock = threading.Lock()
+
+        if spec:
+            with open(spec, 'r', encoding='utf-8') as f:
+                document = yaml.safe_load(f)
+
+            servers = document.get('servers') or [{}]
+            self.base_path = urlsplit(servers[0].get('url', '')).path.rstrip('/')
+
+            for path, operations in document['paths'].items():
+                for method, operation in operations.items():
+                    if isinstance(operation, dict) and 'operationId' in operation:
+                        self.route(method, path, operation['operationId'])
+
+    def route(self, method: str, path: str, operation_id: str):
+        pattern = re.sub(r'\\\{(\w+)\\\}', r'(?P<\1>[^/]+)', re.escape(f'{self.base_path}{path}'))
+
+        self.routes.append((method.upper(), re.compile(f'^{pattern}$'), operation_id))
+
+        # Literal segments win over templated ones, like /manga/random over /manga/{id}
+        self.routes.sort(key=lambda route: route[1].pattern.count('(?P<'))
+
+    def handle(self, method: str, target: str, headers: Any, body: bytes) -> Response:
+        url = urlsplit(target)
+
+        for route_method, pattern, operation_id in self.routes:
+            if route_method != method:
+                continue
+
+            match = pattern.match(url.path)
+            if not match:
+                continue
+
+            with self.lock:
+                self.requests[operation_id] += 1
+
+            if self.latency:
+                time.sleep(self.latency)
+
+            if self.limit:
+                allowed, retry_after, remaining = self.limit.take()
+                if not allowed:
+                    return 429, self.error(429, 'Too many requests'), {
+                        'Retry-After': str(max(1, round(retry_after))),
+                        'X-RateLimit-Limit': str(int(self.limit.burst)),
+                        'X-RateLimit-Remaining': '0',
+                        'X-RateLimit-Retry-After': str(int(time.time() + retry_after) + 1)
+                    }
+            else:
+                remaining = None
+
+            with self.lock:
+                failed = self.error_rate and self.random.random() < self.error_rate
+            if failed:
+                return 503, self.error(503, 'Service unavailable'), {}
+
+            handler = self.handlers.get(operation_id)
+            if not handler:
+                return 501, self.error(501, f'{operation_id} is not mocked'), {}
+
+            params = {k: unquote(v) for k, v in match.groupdict().items()}
+
+            query: dict[str, list[str]] = {}
+            for k, v in parse_qs(url.query).items():
+                query.setdefault(k.removesuffix('[]'), []).extend(v)
+
+            payload = json.loads(body) if body else None
+
+            status, result, result_headers = handler(params, query, payload, headers)
+            if remaining is not None:
+                result_headers['X-RateLimit-Remaining'] = str(remaining)
+
+            return status, result, result_headers
+
+        return 404, self.error(404, 'Route not found'), {}
+
+    def error(self, status: int, message: str):
+        return {'message': message}
+
+    def count(self, status: int):
+        with self.lock:
+            self.statuses[status] += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                'requests': dict(self.requests),
+                'statuses': {str(k): v for k, v in self.statuses.items()}
+            }
+
+class Catalogue:
+    website_mangadex_host = 'mangadex.org'
+
+    def __init__(
+        self,
+        size: int = 100,
+        chapters: int = 5,
+        existing: float = 0.9,
+        fresh_chapters: int = 1,
+        unsupported: float = 0.1,
+        seed: int = 0
+    ):
+        self.size = size
+        self.chapters = chapters
+        self.fresh_chapters = fresh_chapters
+
+        rng = random.Random(seed)
+
+        self.existing = [rng.random() < existing for _ in range(size)]
+        self.languages = ['fr' if rng.random() < unsupported else 'en' for _ in range(size)]
+
+        # Everything the scraper writes, on top of the seeded state derived from the flags above
+        self.added_languages: dict[str, str] = {}
+        self.added_websites: dict[str, str] = {}
+        self.added_links: set[str] = set()
+        self.added_comics: set[str] = set()
+        self.added_comic_providers: dict[str, set[tuple[str, str]]] = {}
+        self.added_comic_chapters: dict[str, set[str]] = {}
+        self.added_comic_chapter_providers: dict[tuple[str, str], set[tuple[str, str]]] = {}
+
+        self.totals: dict[tuple[Any, ...], int] = {}
+
+        self.lock = threading.Lock()
+
+    #
+    # Identity
+    #
+
+    def id(self, kind: int, index: int):
+        return str(uuid.UUID(int=(kind << 48) | index, version=4))
+
+    def index(self, kind: int, id: str):
+        try:
+            value = uuid.UUID(id).int
+        except ValueError:
+            return None
+
+        index = value & 0xFFFFFFFFFFFF
+        if (value >> 48) & 0xFF != kind:
+            return None
+        if index >= (self.size if kind == KIND_MANGA else self.size * self.chapters):
+            return None
+
+        return index
+
+    def code(self, manga_index: int):
+        return f'bench-{manga_index}'
+
+    def code_index(self, code: str):
+        try:
+            index = int(code.removeprefix('bench-'))
+        except ValueError:
+            return None
+
+        return index if 0 <= index < self.size else None
+
+    def href_index(self, href: str) -> tuple[int, int] | None:
+        prefix = f'{self.website_mangadex_host}/'
+        if not href.startswith(prefix):
+            return None
+
+        match href[len(prefix):].split('/'):
+            case ['title', id]:
+                index = self.index(KIND_MANGA, id)
+                return None if index is None else (KIND_MANGA, index)
+            case ['chapter', id]:
+                index = self.index(KIND_CHAPTER, id)
+                return None if index is None else (KIND_CHAPTER, index)
+
+        return None
+
+    def chapter_seeded(self, chapter_index: int):
+        manga_index, k = divmod(chapter_index, self.chapters)
+        return self.existing[manga_index] and k < self.chapters - self.fresh_chapters
+
+    #
+    # MangaDex
+    #
+
+    def manga(self, index: int):
+        return {
+            'id': self.id(KIND_MANGA, index),
+            'type': 'manga',
+            'attributes': {
+                'title': {'en': f'Bench {index}'},
+                'links': {'mal': str(index + 1)},
+                'status': 'ongoing',
+                'contentRating': 'safe',
+                'state': 'published',
+                'availableTranslatedLanguages': [self.languages[index]],
+                'version': 1,
+                'createdAt': timestamp(EPOCH + index * 60),
+                'updatedAt': timestamp(EPOCH + index * 60)
+            },
+            'relationships': []
+        }
+
+    def chapter(self, index: int, includes: list[str] | None = None):
+        manga_index, k = divmod(index, self.chapters)
+
+        manga = {'id': self.id(KIND_MANGA, manga_index), 'type': 'manga'}
+        if includes and 'manga' in includes:
+            manga['attributes'] = self.manga(manga_index)['attributes']
+
+        return {
+            'id': self.id(KIND_CHAPTER, index),
+            'type': 'chapter',
+            'attributes': {
+                'chapter': str(k + 1),
+                'pages': 20,
+                'translatedLanguage': self.languages[manga_index],
+                'version': 1,
+                'createdAt': timestamp(EPOCH + index * 10),
+                'updatedAt': timestamp(EPOCH + index * 10),
+                'publishAt': TIMESTAMP,
+                'readableAt': TIMESTAMP
+            },
+            'relationships': [manga]
+        }
+
+    def window(
+        self,
+        key: tuple[Any, ...],
+        start: int,
+        stop: int,
+        keep: Callable[[int], bool],
+        offset: int,
+        limit: int,
+        descending: bool = False
+    ):
+        indexes = range(stop - 1, start - 1, -1) if descending else range(start, stop)
+
+        # Offsets are capped at 10000, so walking the filter from the start stays cheap
+        page: list[int] = []
+        skipped = 0
+        for index in indexes:
+            if not keep(index):
+                continue
+            if skipped < offset:
+                skipped += 1
+                continue
+            if len(page) >= limit:
+                break
+            page.append(index)
+
+        with self.lock:
+            if key not in self.totals:
+                self.totals[key] = sum(1 for index in range(start, stop) if keep(index))
+            total = self.totals[key]
+
+        return page, total
+
+    def start(self, query: dict[str, list[str]], step: int, stop: int):
+        # Entities are created and updated a step apart in index order, either cursor maps to an index
+        start = 0
+        for key in ('createdAtSince', 'updatedAtSince'):
+            value = since(query.get(key, [None])[0])
+            if value is not None:
+                start = max(start, min(stop, -int((EPOCH - value) // step)))
+
+        return start
+
+    def descending(self, query: dict[str, list[str]]):
+        return 'desc' in (query.get('order[createdAt]', [''])[0], query.get('order[updatedAt]', [''])[0])
+
+    def collection(self, data: list[Any], limit: int, offset: int, total: int) -> Response:
+        return 200, {
+            'result': 'ok',
+            'response': 'collection',
+            'data': data,
+            'limit': limit,
+            'offset': offset,
+            'total': total
+        }, {}
+
+    def paging(self, query: dict[str, list[str]], default: int = 10):
+        limit = int(query.get('limit', [default])[0])
+        offset = int(query.get('offset', [0])[0])
+
+        if offset + limit > 10000:
+            return None
+
+        return limit, offset
+
+    def mangadex_error(self, status: int, detail: str) -> Response:
+        return status, {
+            'result': 'error',
+            'errors': [{'id': str(uuid.uuid4()), 'status': status, 'title': detail, 'detail': detail}]
+        }, {}
+
+    def get_search_manga(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        paging = self.paging(query)
+        if not paging:
+            return self.mangadex_error(400, 'Offset and limit exceed 10000')
+        limit, offset = paging
+
+        if 'ids' in query:
+            indexes = [self.index(KIND_MANGA, id) for id in query['ids']]
+            data = [self.manga(index) for index in indexes if index is not None]
+            return self.collection(data[offset:offset+limit], limit, offset, len(data))
+
+        start = self.start(query, 60, self.size)
+
+        page, total = self.window(
+            ('manga', start),
+            start,
+            self.size,
+            lambda index: True,
+            offset,
+            limit,
+            self.descending(query)
+        )
+
+        return self.collection([self.manga(index) for index in page], limit, offset, total)
+
+    def get_manga_id(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        index = self.index(KIND_MANGA, params['id'])
+        if index is None:
+            return self.mangadex_error(404, 'Manga not found')
+
+        return 200, {'result': 'ok', 'response': 'entity', 'data': self.manga(index)}, {}
+
+    def get_manga_id_feed(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        index = self.index(KIND_MANGA, params['id'])
+        if index is None:
+            return self.mangadex_error(404, 'Manga not found')
+
+        paging = self.paging(query, 100)
+        if not paging:
+            return self.mangadex_error(400, 'Offset and limit exceed 10000')
+        limit, offset = paging
+
+        languages = query.get('translatedLanguage')
+        if languages and self.languages[index] not in languages:
+            return self.collection([], limit, offset, 0)
+
+        start = index * self.chapters
+        indexes = list(range(start, start + self.chapters))
+
+        return self.collection(
+            [self.chapter(index) for index in indexes[offset:offset+limit]],
+            limit, offset, len(indexes)
+        )
+
+    def get_chapter(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        paging = self.paging(query)
+        if not paging:
+            return self.mangadex_error(400, 'Offset and limit exceed 10000')
+        limit, offset = paging
+
+        start = self.start(query, 10, self.size * self.chapters)
+
+        languages = tuple(sorted(query.get('translatedLanguage', [])))
+
+        page, total = self.window(
+            ('chapter', start, languages),
+            start,
+            self.size * self.chapters,
+            lambda index: not languages or self.languages[index // self.chapters] in languages,
+            offset,
+            limit,
+            self.descending(query)
+        )
+
+        includes = query.get('includes')
+
+        return self.collection([self.chapter(index, includes) for index in page], limit, offset, total)
+
+    #
+    # ComicBagi
+    #
+
+    def listing(self, data: list[Any], query: dict[str, list[str]]) -> Response:
+        page = max(1, int(query.get('page', [1])[0]))
+        limit = int(query.get('limit', [10])[0])
+
+        return 200, data[(page-1)*limit:page*limit], {
+            'X-Total-Count': str(len(data)),
+            'X-Pagination-Limit': str(limit)
+        }
+
+    def unauthorized(self, headers: Any) -> Response | None:
+        if not (headers.get('Authorization') or '').startswith('Bearer '):
+            return 401, {'message': 'Unauthorized'}, {}
+        return None
+
+    def language_object(self, lang: str, name: str):
+        return {'createdAt': TIMESTAMP, 'updatedAt': TIMESTAMP, 'lang': lang, 'name': name}
+
+    def link_object(self, href: str):
+        host, _, rest = href.partition('/')
+        return {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'websiteHost': host,
+            'websiteName': 'MangaDex' if host == self.website_mangadex_host else host,
+            'websiteRedacted': False,
+            'relativeReference': f'/{rest}' if rest else ''
+        }
+
+    def provider_object(self, href: str, lang: str):
+        link = self.link_object(href)
+        return {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'ulid': str(uuid.uuid5(uuid.NAMESPACE_URL, f'{href} {lang}')),
+            'linkWebsiteHost': link['websiteHost'],
+            'linkWebsiteName': link['websiteName'],
+            'linkWebsiteRedacted': False,
+            'linkRelativeReference': link['relativeReference'],
+            'languageLang': lang,
+            'releasedAt': TIMESTAMP
+        }
+
+    def link_exists(self, href: str):
+        if href in self.added_links:
+            return True
+
+        match self.href_index(href):
+            case (kind, index) if kind == KIND_MANGA:
+                return self.existing[index]
+            case (kind, index) if kind == KIND_CHAPTER:
+                return self.chapter_seeded(index)
+
+        return False
+
+    def comic_exists(self, code: str):
+        if code in self.added_comics:
+            return True
+
+        index = self.code_index(code)
+        return index is not None and self.existing[index]
+
+    def comic_providers(self, code: str):
+        providers = set(self.added_comic_providers.get(code, ()))
+
+        index = self.code_index(code)
+        if index is not None and self.existing[index]:
+            href = f'{self.website_mangadex_host}/title/{self.id(KIND_MANGA, index)}'
+            providers.add((href, self.languages[index]))
+
+        return providers
+
+    def comic_chapters(self, code: str):
+        chapters = set(self.added_comic_chapters.get(code, ()))
+
+        index = self.code_index(code)
+        if index is not None:
+            for k in range(self.chapters):
+                if self.chapter_seeded(index * self.chapters + k):
+                    chapters.add(str(k + 1))
+
+        return chapters
+
+    def comic_chapter_providers(self, code: str, nv: str):
+        providers = set(self.added_comic_chapter_providers.get((code, nv), ()))
+
+        index = self.code_index(code)
+        if index is not None and nv.isdigit() and 0 < int(nv) <= self.chapters:
+            chapter_index = index * self.chapters + int(nv) - 1
+            if self.chapter_seeded(chapter_index):
+                href = f'{self.website_mangadex_host}/chapter/{self.id(KIND_CHAPTER, chapter_index)}'
+                providers.add((href, self.languages[index]))
+
+        return providers
+
+    def list_language(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        with self.lock:
+            data = [self.language_object(k, v) for k, v in self.added_languages.items()]
+
+        return self.listing(data, query)
+
+    def add_language(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        with self.lock:
+            if body['lang'] in self.added_languages:
+                return 409, {'message': 'Language already exists'}, {}
+            self.added_languages[body['lang']] = body['name']
+
+        return 201, self.language_object(body['lang'], body['name']), {}
+
+    def get_website(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        with self.lock:
+            name = self.added_websites.get(params['host'])
+
+        if name is None:
+            return 404, {'message': 'Website not found'}, {}
+
+        return 200, {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'host': params['host'],
+            'name': name,
+            'redacted': True,
+            'linkCount': 0
+        }, {}
+
+    def add_website(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        with self.lock:
+            self.added_websites[body['host']] = body['name']
+
+        return 201, {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'host': body['host'],
+            'name': body['name'],
+            'redacted': bool(body.get('redacted')),
+            'linkCount': 0
+        }, {}
+
+    def list_link(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        hrefs = [unquote(href) for href in query.get('href', [])]
+
+        with self.lock:
+            data = [self.link_object(href) for href in dict.fromkeys(hrefs) if self.link_exists(href)]
+
+        return self.listing(data, query)
+
+    def get_link(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        with self.lock:
+            exists = self.link_exists(params['href'])
+
+        if not exists:
+            return 404, {'message': 'Link not found'}, {}
+
+        return 200, self.link_object(params['href']), {}
+
+    def add_link(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        href = f'{body["websiteHost"]}{body.get("relativeReference") or ""}'
+
+        with self.lock:
+            if self.link_exists(href):
+                return 409, {'message': 'Link already exists'}, {}
+            self.added_links.add(href)
+
+        return 201, self.link_object(href), {}
+
+    def list_comic(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        hrefs = {unquote(href) for href in query.get('providerLinkHREF', [])}
+
+        with self.lock:
+            codes: dict[str, None] = {}
+
+            for href in hrefs:
+                match self.href_index(href):
+                    case (kind, index) if kind == KIND_MANGA and self.existing[index]:
+                        codes[self.code(index)] = None
+
+            for code, providers in self.added_comic_providers.items():
+                if any(href in hrefs for href, _ in providers):
+                    codes[code] = None
+
+            data = [{
+                'createdAt': TIMESTAMP,
+                'updatedAt': TIMESTAMP,
+                'code': code,
+                'providerCount': len(self.comic_providers(code)),
+                'chapterCount': len(self.comic_chapters(code))
+            } for code in codes]
+
+        return self.listing(data, query)
+
+    def get_comic(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        with self.lock:
+            if not self.comic_exists(params['code']):
+                return 404, {'message': 'Comic not found'}, {}
+
+            return 200, {
+                'createdAt': TIMESTAMP,
+                'updatedAt': TIMESTAMP,
+                'code': params['code'],
+                'providerCount': len(self.comic_providers(params['code'])),
+                'chapterCount': len(self.comic_chapters(params['code']))
+            }, {}
+
+    def add_comic(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        with self.lock:
+            if self.comic_exists(body['code']):
+                return 409, {'message': 'Comic already exists'}, {}
+            self.added_comics.add(body['code'])
+
+        return 201, {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'code': body['code'],
+            'providerCount': 0,
+            'chapterCount': 0
+        }, {}
+
+    def list_comic_provider(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        hrefs = {unquote(href) for href in query.get('linkHREF', [])}
+
+        with self.lock:
+            providers = self.comic_providers(params['comicCode'])
+
+        data = [
+            self.provider_object(href, lang) for href, lang in sorted(providers)
+            if not hrefs or href in hrefs
+        ]
+
+        return self.listing(data, query)
+
+    def add_comic_provider(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        href = f'{body["linkWebsiteHost"]}{body.get("linkRelativeReference") or ""}'
+        lang = body.get('languageLang') or ''
+
+        with self.lock:
+            if not self.comic_exists(params['comicCode']) or not self.link_exists(href):
+                return 400, {'message': 'Comic or link does not exist'}, {}
+            self.added_comic_providers.setdefault(params['comicCode'], set()).add((href, lang))
+
+        return 201, self.provider_object(href, lang), {}
+
+    def list_comic_chapter(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        hrefs = {unquote(href) for href in query.get('providerLinkHREF', [])}
+        langs = set(query.get('providerLanguageLang', []))
+
+        with self.lock:
+            chapters = self.comic_chapters(params['comicCode'])
+
+            if hrefs or langs:
+                chapters = {
+                    nv for nv in chapters
+                    if any(
+                        (not hrefs or href in hrefs) and (not langs or lang in langs)
+                        for href, lang in self.comic_chapter_providers(params['comicCode'], nv)
+                    )
+                }
+
+        data = [{
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'number': float(nv) if '.' in nv else int(nv),
+            'version': None,
+            'providerCount': 1
+        } for nv in sorted(chapters, key=float)]
+
+        return self.listing(data, query)
+
+    def get_comic_chapter(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        with self.lock:
+            exists = params['nv'] in self.comic_chapters(params['comicCode'])
+
+        if not exists:
+            return 404, {'message': 'Comic chapter not found'}, {}
+
+        nv = params['nv']
+        return 200, {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'number': float(nv) if '.' in nv else int(nv),
+            'version': None,
+            'providerCount': 1
+        }, {}
+
+    def add_comic_chapter(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        nv = str(body['number'])
+        if body.get('version'):
+            nv = f'{nv}+{body["version"]}'
+
+        with self.lock:
+            if not self.comic_exists(params['comicCode']):
+                return 404, {'message': 'Comic not found'}, {}
+            if nv in self.comic_chapters(params['comicCode']):
+                return 409, {'message': 'Comic chapter already exists'}, {}
+            self.added_comic_chapters.setdefault(params['comicCode'], set()).add(nv)
+
+        return 201, {
+            'createdAt': TIMESTAMP,
+            'updatedAt': TIMESTAMP,
+            'number': body['number'],
+            'version': body.get('version'),
+            'providerCount': 0
+        }, {}
+
+    def list_comic_chapter_provider(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        hrefs = {unquote(href) for href in query.get('linkHREF', [])}
+        langs = set(query.get('languageLang', []))
+
+        with self.lock:
+            providers = self.comic_chapter_providers(params['comicCode'], params['chapterNV'])
+
+        data = [
+            self.provider_object(href, lang) for href, lang in sorted(providers)
+            if (not hrefs or href in hrefs) and (not langs or lang in langs)
+        ]
+
+        return self.listing(data, query)
+
+    def add_comic_chapter_provider(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        if error := self.unauthorized(headers):
+            return error
+
+        href = f'{body["linkWebsiteHost"]}{body.get("linkRelativeReference") or ""}'
+        lang = body.get('languageLang') or ''
+
+        key = (params['comicCode'], params['chapterNV'])
+
+        with self.lock:
+            if params['chapterNV'] not in self.comic_chapters(params['comicCode']) or not self.link_exists(href):
+                return 400, {'message': 'Comic chapter or link does not exist'}, {}
+            self.added_comic_chapter_providers.setdefault(key, set()).add((href, lang))
+
+        return 201, self.provider_object(href, lang), {}
+
+    #
+    # OAuth
+    #
+
+    def token(self, params: dict[str, str], query: dict[str, list[str]], body: Any, headers: Any):
+        return 200, {'access_token': 'bench', 'token_type': 'Bearer', 'expires_in': 86400}, {}
+
+class MangaDexService(Service):
+    def error(self, status: int, message: str):
+        return {
+            'result': 'error',
+            'errors': [{'id': str(uuid.uuid4()), 'status': status, 'title': message, 'detail': message}]
+        }
+
+def handler(service: Service):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+            if self.path == '/__bench/stats':
+                status, result, headers = 200, service.stats(), {}
+            else:
+                status, result, headers = service.handle(self.command, self.path, self.headers, body)
+
+            service.count(status)
+
+            data = json.dumps(result).encode()
+
+            # Mirror what a production gateway does for large payloads
+            if len(data) > 1024 and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+                data = gzip.compress(data, 1)
+                headers['Content-Encoding'] = 'gzip'
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for k, v in headers.items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = do
+
+        def log_message(self, format: str, *args: Any):
+            pass
+
+    return Handler
+
+def serve(config: dict[str, Any], connection: Connection):
+    catalogue = Catalogue(
+        config['size'],
+        config['chapters'],
+        config['existing'],
+        config['fresh_chapters'],
+        config['unsupported'],
+        config['seed']
+    )
+
+    comicbagi = Service(
+        'comicbagi',
+        config['spec_comicbagi'],
+        config['latency_comicbagi'],
+        config['rate_comicbagi'],
+        config['error_rate'],
+        config['seed']
+    )
+    comicbagi.handlers.update({
+        'listLanguage': catalogue.list_language,
+        'addLanguage': catalogue.add_language,
+        'getWebsite': catalogue.get_website,
+        'addWebsite': catalogue.add_website,
+        'listLink': catalogue.list_link,
+        'getLink': catalogue.get_link,
+        'addLink': catalogue.add_link,
+        'listComic': catalogue.list_comic,
+        'getComic': catalogue.get_comic,
+        'addComic': catalogue.add_comic,
+        'listComicProvider': catalogue.list_comic_provider,
+        'addComicProvider': catalogue.add_comic_provider,
+        'listComicChapter': catalogue.list_comic_chapter,
+        'getComicChapter': catalogue.get_comic_chapter,
+        'addComicChapter': catalogue.add_comic_chapter,
+        'listComicChapterProvider': catalogue.list_comic_chapter_provider,
+        'addComicChapterProvider': catalogue.add_comic_chapter_provider
+    })
+
+    mangadex = MangaDexService(
+        'mangadex',
+        config['spec_mangadex'],
+        config['latency_mangadex'],
+        config['rate_mangadex'],
+        config['error_rate'],
+        config['seed']
+    )
+    mangadex.handlers.update({
+        'get-search-manga': catalogue.get_search_manga,
+        'get-manga-id': catalogue.get_manga_id,
+        'get-manga-id-feed': catalogue.get_manga_id_feed,
+        'get-chapter': catalogue.get_chapter
+    })
+
+    oauth = Service('oauth', latency=config['latency_oauth'])
+    oauth.route('POST', '/oauth/token', 'token')
+    oauth.handlers['token'] = catalogue.token
+
+    servers: dict[str, ThreadingHTTPServer] = {}
+    for service in (comicbagi, mangadex, oauth):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), handler(service))
+        server.daemon_threads = True
+
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        servers[service.name] = server
+
+    connection.send({
+        'comicbagi': f'http://127.0.0.1:{servers["comicbagi"].server_port}{comicbagi.base_path}',
+        'mangadex': f'http://127.0.0.1:{servers["mangadex"].server_port}',
+        'oauth': f'http://127.0.0.1:{servers["oauth"].server_port}/'
+    })
+
+    # Block until the driver is done with this catalogue
+    connection.recv()
+
+    for server in servers.values():
+        server.shutdown()
@@ -0,0 +1,109 @@
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any
+
+PACKAGE = 'src.comicbagi_scrap'
+
+def import_times(module: str | None):
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}' if module else 'pass'],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+
+    # import time: self [us] | cumulative | imported package
+    times: dict[str, tuple[int, int]] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+
+        fields = line.removeprefix('import time:').split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+
+        times[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+
+    return times
+
+def wall(command: list[str], repeat: int):
+    samples: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(command, capture_output=True, check=True)
+        samples.append(time.perf_counter() - started)
+
+    return statistics.median(samples)
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    # A single -X importtime sample swings with the disk cache, keep the median run
+    samples = [import_times(PACKAGE) for _ in range(args.repeat)]
+    samples.sort(key=lambda v: v.get(PACKAGE, (0, 0))[1])
+    times = samples[len(samples) // 2]
+
+    # Whatever the interpreter loads by itself is not the package's doing
+    interpreter = import_times(None)
+
+    baseline = wall([sys.executable, '-c', 'pass'], args.repeat)
+    help = wall([sys.executable, '-m', PACKAGE, '--help'], args.repeat)
+
+    heaviest = sorted(
+        (
+            (name, cumulative) for name, (_, cumulative) in times.items()
+            if name != PACKAGE and name not in interpreter
+        ),
+        key=lambda item: -item[1]
+    )[:args.top]
+
+    return {
+        'import': times.get(PACKAGE, (0, 0))[1] / 1000,
+        'help': (help - baseline) * 1000,
+        'interpreter': baseline * 1000,
+        'modules': len(times.keys() - interpreter.keys()),
+        'heaviest': [{'module': name, 'cumulative': cumulative / 1000} for name, cumulative in heaviest]
+    }
+
+def report(result: dict[str, Any], args: argparse.Namespace):
+    print('# startup')
+    print(f'import    {result["import"]:10.1f} ms (budget {args.budget_import:g} ms, {result["modules"]} modules)')
+    print(f'--help    {result["help"]:10.1f} ms (budget {args.budget_help:g} ms, '
+          f'over {result["interpreter"]:.1f} ms of bare interpreter)')
+    for item in result['heaviest']:
+        print(f'  {item["module"]:48} {item["cumulative"]:8.1f} ms')
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench.startup')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of the import and --help, the median is kept')
+    parser.add_argument('--top', type=int, default=10, help='heaviest imports listed')
+    parser.add_argument('--budget-import', type=float, default=50, help='milliseconds to import the package')
+    parser.add_argument('--budget-help', type=float, default=150, help='milliseconds --help takes over a bare interpreter')
+    parser.add_argument('--json', help='write the results to this file as well')
+    args = parser.parse_args()
+
+    result = run(args)
+    report(result, args)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+
+    over = [
+        name for name, value, budget in [
+            ('import', result['import'], args.budget_import),
+            ('--help', result['help'], args.budget_help)
+        ]
+        if value > budget
+    ]
+    if over:
+        print(f'Over budget: {", ".join(over)}')
+        return 1
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
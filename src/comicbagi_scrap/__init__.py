@@ -1,56 +1,335 @@
 import os
+import sys
+import glob
 import dotenv
+import argparse
 import logging
-import comicking_scrap
+import threading
+from urllib.parse import urlparse
 
-from .bot import Bot
-from .bot_mangadex import BotMangaDex
+def shard_arg(value: str) -> tuple[int, int]:
+    try:
+        index, count = map(int, value.split('/'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected I/N, like 1/4')
 
-logging.basicConfig(level=logging.DEBUG)
+    if count < 1 or not 1 <= index <= count:
+        raise argparse.ArgumentTypeError('expected 1 <= I <= N')
 
-def main():
+    return index, count
+
+def shards_arg(value: str) -> int:
+    try:
+        count = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected N, like 4')
+
+    if count < 1:
+        raise argparse.ArgumentTypeError('expected N >= 1')
+
+    return count
+
+def shard_paths(path: str):
+    root, ext = os.path.splitext(path)
+
+    return sorted(glob.glob(f'{glob.escape(root)}.[0-9]*-[0-9]*{glob.escape(ext)}'))
+
+def shard_path(path: str, shard: tuple[int, int] | None):
+    if not path or not shard:
+        return path
+
+    root, ext = os.path.splitext(path)
+
+    return f'{root}.{shard[0]}-{shard[1]}{ext}'
+
+def serve():
+    main(['--serve', *sys.argv[1:]])
+
+def main(argv: list[str] | None = None):
     dotenv.load_dotenv()
 
-    logger = logging.getLogger(__name__)
-    note_file = open('bot.txt', 'a', encoding='utf-8')
+    logging.basicConfig(level=(os.getenv('COMICBAGI_SCRAP_LOG_LEVEL') or 'INFO').upper())
 
-    bot = Bot(
-        os.getenv('COMICBAGI_SCRAP_BASE_COMICBAGI') or '',
-        oauth_issuer=os.getenv('COMICBAGI_SCRAP_OAUTH_ISSUER') or '',
-        oauth_client_id=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_ID') or '',
-        oauth_client_secret=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_SECRET') or '',
-        oauth_audience=os.getenv('COMICBAGI_SCRAP_OAUTH_AUDIENCE') or '',
-        logger=logger,
-        note_file=note_file
+    parser = argparse.ArgumentParser(prog='comicbagi-scrap')
+    parser.add_argument(
+        '--clear-cache',
+        nargs='*',
+        metavar='KIND',
+        help='invalidate the existence cache (all kinds if none given) and exit'
     )
-    bot.load(True)
-
-    bot_comicking = comicking_scrap.Bot(
-        os.getenv('COMICBAGI_SCRAP_BASE_COMICKING') or '',
-        oauth_issuer=os.getenv('COMICBAGI_SCRAP_OAUTH_ISSUER') or '',
-        oauth_client_id=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_ID') or '',
-        oauth_client_secret=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_SECRET') or '',
-        oauth_audience=os.getenv('COMICBAGI_SCRAP_OAUTH_AUDIENCE') or '',
-        logger=logger,
-        note_file=note_file
+    parser.add_argument(
+        '--reset-checkpoint',
+        nargs='*',
+        metavar='MODE',
+        help='forget the scrape position (all modes if none given) and exit'
+    )
+    parser.add_argument(
+        '--shard',
+        type=shard_arg,
+        metavar='I/N',
+        help='only scrape the manga hashed to shard I of N, with its own checkpoint, notes, metrics and plan'
+    )
+    parser.add_argument(
+        '--shards',
+        type=shards_arg,
+        metavar='N',
+        help='run N shards as child processes and wait for them'
+    )
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='keep running and poll MangaDex for new chapters until SIGTERM'
     )
-    bot_comicking.load(True)
+    args = parser.parse_args(argv)
+
+    from .cache import Cache
+    from .checkpoint import Checkpoint
+
+    logger = logging.getLogger(__name__)
+
+    mode = os.getenv('COMICBAGI_SCRAP_MODE') or 'comic'
+
+    if args.shard and args.shards:
+        parser.error('--shard and --shards cannot be combined')
+    if (args.shard or args.shards) and mode == 'incremental':
+        parser.error('incremental mode cannot be sharded')
+    if args.serve and (args.shard or args.shards):
+        parser.error('--serve cannot be sharded')
+    if args.serve and (os.getenv('COMICBAGI_SCRAP_DRY_RUN') or '0') == '1':
+        parser.error('--serve cannot be a dry run')
+    if mode == 'incremental' and (os.getenv('COMICBAGI_SCRAP_DRY_RUN') or '0') == '1':
+        parser.error('incremental mode cannot be a dry run')
+
+    shards = [args.shard]
+    if args.shards:
+        shards = [(i, args.shards) for i in range(1, args.shards + 1)]
+
+    cache = None
+    if os.getenv('COMICBAGI_SCRAP_CACHE'):
+        cache = Cache(
+            os.getenv('COMICBAGI_SCRAP_CACHE') or '',
+            float(os.getenv('COMICBAGI_SCRAP_CACHE_TTL') or 604800)
+        )
+
+    checkpoints = [
+        Checkpoint(shard_path(os.getenv('COMICBAGI_SCRAP_CHECKPOINT') or '', shard)) for shard in shards
+    ] if os.getenv('COMICBAGI_SCRAP_CHECKPOINT') else []
+
+    if args.clear_cache is not None or args.reset_checkpoint is not None:
+        if args.clear_cache is not None:
+            if not cache:
+                parser.error('COMICBAGI_SCRAP_CACHE is not configured')
+
+            for kind in args.clear_cache or [None]:
+                logger.info('Cache "%s" cleared (%d entries)', kind or '*', cache.clear(kind))
+
+        if args.reset_checkpoint is not None:
+            if not checkpoints:
+                parser.error('COMICBAGI_SCRAP_CHECKPOINT is not configured')
+
+            # Without a shard given, the checkpoints left by sharded runs start over too
+            if not args.shard and not args.shards:
+                checkpoints += [
+                    Checkpoint(path) for path in shard_paths(os.getenv('COMICBAGI_SCRAP_CHECKPOINT') or '')
+                ]
+
+            for checkpoint in checkpoints:
+                for checkpoint_mode in args.reset_checkpoint or [None]:
+                    checkpoint.reset(checkpoint_mode)
+
+                    logger.info('Checkpoint "%s" reset in %s', checkpoint_mode or '*', checkpoint.path)
 
-    bot_comicking_jikan = comicking_scrap.BotJikan(
-        bot_comicking,
-        logger=logger
+        if cache:
+            cache.close()
+        return
+
+    if args.shards:
+        import subprocess
+
+        if cache:
+            cache.close()
+
+        processes = [
+            subprocess.Popen([sys.executable, '-m', __name__, '--shard', '%d/%d' % shard])
+            for shard in shards
+        ]
+
+        failed = ['%d/%d' % shard for shard, process in zip(shards, processes) if process.wait() != 0]
+        if failed:
+            logger.error('Shards %s failed', ', '.join(failed))
+            sys.exit(1)
+        return
+
+    # The API clients and their generated models are only loaded once a scrape is really going to run
+    import comicking_scrap
+
+    from .audit import AuditLog
+    from .bot import Bot
+    from .bot_mangadex import BotMangaDex
+    from .decode import Decoder
+    from .metrics import Metrics
+    from .oauth import TokenManager
+    from .ratelimit import RateLimiter
+    from .transport import Transport
+
+    checkpoint = checkpoints[0] if checkpoints else None
+
+    audit_log = None
+    if os.getenv('COMICBAGI_SCRAP_AUDIT'):
+        audit_log = AuditLog(
+            shard_path(os.getenv('COMICBAGI_SCRAP_AUDIT') or '', args.shard),
+            int(os.getenv('COMICBAGI_SCRAP_AUDIT_MAX_BYTES') or 104857600),
+            int(os.getenv('COMICBAGI_SCRAP_AUDIT_BACKUPS') or 5)
+        )
+        audit_log.start()
+
+    transport = Transport(
+        int(os.getenv('COMICBAGI_SCRAP_HTTP_POOL_SIZE') or 10),
+        float(os.getenv('COMICBAGI_SCRAP_HTTP_TIMEOUT') or 30),
+        float(os.getenv('COMICBAGI_SCRAP_HTTP_CONNECT_TIMEOUT') or 10),
+        (os.getenv('COMICBAGI_SCRAP_HTTP_KEEPALIVE') or '1') == '1',
+        (os.getenv('COMICBAGI_SCRAP_HTTP_COMPRESSION') or '1') == '1'
     )
-    bot_comicking_jikan.load(True)
 
-    bot_mangadex = BotMangaDex(
-        bot,
-        comicking_jikan_bot=bot_comicking_jikan,
-        logger=logger
+    # Shards draw from one budget through the shared file, or else split the rates between them
+    rate_budget = os.getenv('COMICBAGI_SCRAP_RATE_BUDGET') or None
+
+    rate_share = args.shard[1] if args.shard and not rate_budget else 1
+    concurrency_share = args.shard[1] if args.shard else 1
+
+    rate_limiter = RateLimiter(budget_path=rate_budget)
+    rate_limiter.add(
+        urlparse(os.getenv('COMICBAGI_SCRAP_BASE_COMICBAGI') or '').netloc,
+        float(os.getenv('COMICBAGI_SCRAP_RATE_LIMIT_COMICBAGI') or 2) / rate_share,
+        float(os.getenv('COMICBAGI_SCRAP_RATE_BURST_COMICBAGI') or 0) / rate_share or None,
+        -(-int(os.getenv('COMICBAGI_SCRAP_CONCURRENCY_COMICBAGI') or 0) // concurrency_share) or None
     )
-    bot_mangadex.process(
-        os.getenv('COMICBAGI_SCRAP_MODE') or 'comic',
-        int(os.getenv('COMICBAGI_SCRAP_MAX_NEW_COMIC') or 0),
-        int(os.getenv('COMICBAGI_SCRAP_MAX_NEW_COMIC_CHAPTER') or 10)
+    rate_limiter.add(
+        'api.mangadex.org',
+        float(os.getenv('COMICBAGI_SCRAP_RATE_LIMIT_MANGADEX') or 4) / rate_share,
+        float(os.getenv('COMICBAGI_SCRAP_RATE_BURST_MANGADEX') or 0) / rate_share or None,
+        -(-int(os.getenv('COMICBAGI_SCRAP_CONCURRENCY_MANGADEX') or 0) // concurrency_share) or None
+    )
+
+    metrics = None
+    if os.getenv('COMICBAGI_SCRAP_METRICS'):
+        metrics = Metrics(
+            shard_path(os.getenv('COMICBAGI_SCRAP_METRICS') or '', args.shard),
+            float(os.getenv('COMICBAGI_SCRAP_METRICS_INTERVAL') or 60),
+            rate_limiter
+        )
+
+    # One token for ComicBagi and ComicKing, both take the same credentials
+    token_manager = TokenManager(
+        transport,
+        os.getenv('COMICBAGI_SCRAP_OAUTH_ISSUER') or '',
+        os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_ID') or '',
+        os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_SECRET') or '',
+        os.getenv('COMICBAGI_SCRAP_OAUTH_AUDIENCE') or '',
+        logger,
+        os.getenv('COMICBAGI_SCRAP_OAUTH_TOKEN_CACHE') or None
     )
+    token_manager.start()
+
+    # Buffered audit records and the last metrics export matter most when the run fails
+    try:
+        bot = Bot(
+            os.getenv('COMICBAGI_SCRAP_BASE_COMICBAGI') or '',
+            oauth_issuer=os.getenv('COMICBAGI_SCRAP_OAUTH_ISSUER') or '',
+            oauth_client_id=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_ID') or '',
+            oauth_client_secret=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_SECRET') or '',
+            oauth_audience=os.getenv('COMICBAGI_SCRAP_OAUTH_AUDIENCE') or '',
+            logger=logger,
+            audit_log=audit_log,
+            cache=cache,
+            comic_chapters_maxsize=int(os.getenv('COMICBAGI_SCRAP_MAX_COMIC_CHAPTER_REGISTRY') or 0) or None,
+            rate_limiter=rate_limiter,
+            transport=transport,
+            metrics=metrics,
+            token_manager=token_manager,
+            decoder=Decoder() if (os.getenv('COMICBAGI_SCRAP_FAST_DECODE') or '0') == '1' else None
+        )
+        dry_run = (os.getenv('COMICBAGI_SCRAP_DRY_RUN') or '0') == '1'
+
+        bot.load(not dry_run)
+
+        bot_comicking = comicking_scrap.Bot(
+            os.getenv('COMICBAGI_SCRAP_BASE_COMICKING') or '',
+            oauth_issuer=os.getenv('COMICBAGI_SCRAP_OAUTH_ISSUER') or '',
+            oauth_client_id=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_ID') or '',
+            oauth_client_secret=os.getenv('COMICBAGI_SCRAP_OAUTH_CLIENT_SECRET') or '',
+            oauth_audience=os.getenv('COMICBAGI_SCRAP_OAUTH_AUDIENCE') or '',
+            logger=logger,
+            note_file=audit_log
+        )
+        # Let ComicKing reuse the same connections when its client has the generated layout
+        if hasattr(bot_comicking, 'client') and hasattr(bot_comicking.client, 'rest_client'):
+            transport.install(bot_comicking.client)
+            token_manager.install(bot_comicking.client)
+
+            bot_comicking.authenticate = token_manager.token
+
+        # Seeding writes to ComicKing, which a dry run must not do either
+        bot_comicking.load(not dry_run)
+
+        bot_comicking_jikan = comicking_scrap.BotJikan(
+            bot_comicking,
+            logger=logger
+        )
+        bot_comicking_jikan.load(not dry_run)
+
+        bot_mangadex = BotMangaDex(
+            bot,
+            comicking_jikan_bot=bot_comicking_jikan,
+            logger=logger,
+            checkpoint=checkpoint,
+            preload_links=(os.getenv('COMICBAGI_SCRAP_PRELOAD_LINKS') or '0') == '1',
+            shard=args.shard,
+            rejection_ttl=float(os.getenv('COMICBAGI_SCRAP_REJECTION_TTL') or 259200),
+            mal_ttl=float(os.getenv('COMICBAGI_SCRAP_MAL_TTL') or 2592000)
+        )
+        if metrics:
+            metrics.start()
+
+        if args.serve:
+            import signal
+
+            stopped = threading.Event()
+
+            # Finish the chapter at hand, then release everything as a one-shot run would
+            def stop(signum: int, frame: object):
+                logger.info('Received %s, stopping', signal.Signals(signum).name)
+                stopped.set()
+
+            signal.signal(signal.SIGTERM, stop)
+            signal.signal(signal.SIGINT, stop)
+
+            bot_mangadex.serve(
+                stopped,
+                float(os.getenv('COMICBAGI_SCRAP_SERVE_INTERVAL') or 60),
+                os.getenv('COMICBAGI_SCRAP_INCREMENTAL_SINCE') or None,
+                int(os.getenv('COMICBAGI_SCRAP_SERVE_ATTEMPTS') or 3),
+                int(os.getenv('COMICBAGI_SCRAP_MAX_NEW_COMIC') or 0)
+            )
+        else:
+            bot_mangadex.process(
+                mode,
+                int(os.getenv('COMICBAGI_SCRAP_MAX_NEW_COMIC') or 0),
+                int(os.getenv('COMICBAGI_SCRAP_MAX_NEW_COMIC_CHAPTER') or 10),
+                os.getenv('COMICBAGI_SCRAP_ENGINE') or 'sync',
+                int(os.getenv('COMICBAGI_SCRAP_WORKERS') or 4),
+                os.getenv('COMICBAGI_SCRAP_INCREMENTAL_SINCE') or None,
+                dry_run,
+                shard_path(os.getenv('COMICBAGI_SCRAP_PLAN') or '', args.shard) or None
+            )
+    finally:
+        if metrics:
+            metrics.stop()
+
+        token_manager.stop()
+
+        if audit_log:
+            audit_log.close()
 
-    note_file.close()
+        if cache:
+            cache.close()
@@ -0,0 +1,115 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from typing import Any, Iterable
+
+class AuditLog:
+    def __init__(
+        self,
+        path: str,
+        max_bytes: int = 104857600,
+        backups: int = 5,
+        interval: float = 1,
+        batch: int = 1000
+    ):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self.interval = interval
+        self.batch = batch
+
+        # Callers only append, encoding and file I/O happen on the writer thread
+        self.records: deque[dict[str, Any]] = deque()
+
+        self.file = open(path, 'a', encoding='utf-8')
+
+        self.lock = threading.Lock()
+
+        self.pending = threading.Event()
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def record(self, action: str, **fields: Any):
+        self.records.append({'time': time.time(), 'action': action, **fields})
+
+        if len(self.records) >= self.batch:
+            self.pending.set()
+
+    def writelines(self, lines: Iterable[str]):
+        message = lines if isinstance(lines, str) else ''.join(lines)
+
+        # Blank separator lines of plain text notes carry nothing here
+        if message.strip():
+            self.record('note', message=message.rstrip('\n'))
+
+    def start(self):
+        if self.thread:
+            return
+
+        def run():
+            while not self.stopped.is_set():
+                self.pending.wait(self.interval)
+                self.pending.clear()
+
+                self.flush()
+
+        self.thread = threading.Thread(target=run, name='audit', daemon=True)
+        self.thread.start()
+
+    def flush(self):
+        with self.lock:
+            lines: list[str] = []
+            while self.records:
+                lines.append(json.dumps(self.records.popleft(), default=str))
+
+            if not lines:
+                return
+
+            # Rotate between records so no file passes max_bytes, only a record larger than that on its own does
+            size = self.file.tell()
+            chunk: list[str] = []
+            for line in lines:
+                line_bytes = len(line.encode()) + 1
+
+                if size and size + line_bytes > self.max_bytes:
+                    self.file.writelines(chunk)
+                    self.__rotate()
+
+                    size = 0
+                    chunk = []
+
+                chunk.append(line + '\n')
+                size += line_bytes
+
+            self.file.writelines(chunk)
+            self.file.flush()
+
+    def __rotate(self):
+        self.file.close()
+
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(f'{self.path}.{i}'):
+                    os.replace(f'{self.path}.{i}', f'{self.path}.{i + 1}')
+
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        self.stopped.set()
+        self.pending.set()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        self.flush()
+
+        with self.lock:
+            self.file.close()
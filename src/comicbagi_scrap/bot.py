@@ -1,10 +1,17 @@
-import time
-import requests
 import logging
 import comicbagi_openapi
 from datetime import datetime
-from io import TextIOWrapper
-from typing import Iterable
+from typing import Any, Callable, Iterable, Iterator
+
+from .audit import AuditLog
+from .cache import Cache
+from .decode import Decoder
+from .metrics import Metrics
+from .oauth import TokenManager
+from .paginator import Paginator
+from .ratelimit import RateLimiter
+from .transport import Transport
+from .registry import Registry, ComicChapterRegistry, LinkIndex
 
 class Bot:
     language_english_lang = 'en'
@@ -21,7 +28,14 @@ class Bot:
         oauth_client_secret: str,
         oauth_audience: str,
         logger: logging.Logger,
-        note_file: TextIOWrapper | None = None
+        audit_log: AuditLog | None = None,
+        cache: Cache | None = None,
+        comic_chapters_maxsize: int | None = None,
+        rate_limiter: RateLimiter | None = None,
+        transport: Transport | None = None,
+        metrics: Metrics | None = None,
+        token_manager: TokenManager | None = None,
+        decoder: Decoder | None = None
     ):
         self.client = comicbagi_openapi.ApiClient(
             configuration=comicbagi_openapi.Configuration(
@@ -29,18 +43,41 @@ class Bot:
             )
         )
 
-        self.oauth_issuer = oauth_issuer
-        self.oauth_client_id = oauth_client_id
-        self.oauth_client_secret = oauth_client_secret
-        self.oauth_audience = oauth_audience
-        self.oauth_token_expires = time.time()
+        self.transport = transport or Transport()
+        self.transport.install(self.client)
+
+        self.decoder = decoder
+        if self.decoder:
+            self.decoder.install(self.client)
+
+        self.metrics = metrics
+        if self.metrics:
+            self.metrics.install(self.client)
+            self.metrics.instrument(self)
+
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.rate_limiter.install(self.client)
+
+        # Outermost so the retry after a rejected token is rate limited as well
+        self.token_manager = token_manager or TokenManager(
+            self.transport,
+            oauth_issuer,
+            oauth_client_id,
+            oauth_client_secret,
+            oauth_audience,
+            logger
+        )
+        self.token_manager.install(self.client)
+
+        self.languages: Registry[str] = Registry()
+        self.websites: Registry[str] = Registry()
+        self.comic_chapters = ComicChapterRegistry(comic_chapters_maxsize)
+        self.links = LinkIndex()
 
-        self.languages: list[str] = []
-        self.websites: list[str] = []
-        self.comic_chapters: list[str] = []
+        self.cache = cache
 
         self.logger = logger
-        self.note_file = note_file
+        self.audit_log = audit_log
 
     def load(self, seeding: bool = True):
         if seeding:
@@ -52,29 +89,8 @@ class Bot:
 
         api0 = comicbagi_openapi.LanguageApi(self.client)
 
-        language_page = 1
-        while True:
-            response = api0.list_language_with_http_info(page=language_page, limit=15)
-
-            if not response.data:
-                break
-
-            for language in response.data:
-                self.languages.append(language.lang)
-
-            language_total_count = 0
-
-            if response.headers:
-                for k, v in response.headers.items():
-                    if k.lower() == 'x-total-count':
-                        language_total_count = int(v)
-                        break
-
-            if len(self.languages) >= language_total_count:
-                break
-
-            time.sleep(1)
-            language_page += 1
+        for language in self.list_complete(api0.list_language_with_http_info, limit=15):
+            self.languages.add(language.lang)
 
         if seeding:
             languages = {
@@ -88,43 +104,104 @@ class Bot:
                 if k in self.languages:
                     continue
 
-                result = self.add_language(k, v)
-                if not result:
-                    continue
-
-                time.sleep(2)
+                self.add_language(k, v)
 
     def authenticate(self):
-        if self.oauth_token_expires > time.time() + 300:
+        self.token_manager.token()
+
+    def list_iter(
+        self,
+        __list: Callable[..., Any],
+        *args: Any,
+        limit: int = 15,
+        **kwargs: Any
+    ) -> Iterator[Any]:
+        return iter(Paginator(__list, *args, limit=limit, paging='page', **kwargs))
+
+    def list_complete(
+        self,
+        __list: Callable[..., Any],
+        *args: Any,
+        limit: int = 15,
+        **kwargs: Any
+    ) -> list[Any]:
+        return list(self.list_iter(__list, *args, limit=limit, **kwargs))
+
+    def load_links(self, website_host: str, limit: int = 1000):
+        api0 = comicbagi_openapi.LinkApi(self.client)
+
+        redacted = False
+
+        count = 0
+        total: int | None = None
+
+        def hrefs():
+            nonlocal redacted, count, total
+
+            for page in Paginator(
+                api0.list_link_with_http_info,
+                limit=limit,
+                paging='page',
+                website_host=[website_host],
+                unredact=[website_host]
+            ).pages():
+                total = page.total
+
+                for link in page.data:
+                    count += 1
+
+                    if link.website_redacted and not link.relative_reference:
+                        redacted = True
+                        continue
+
+                    yield f'{link.website_host}{link.relative_reference or ""}'
+
+        self.links.load(website_host, hrefs())
+
+        # An index with hidden references would report every link as missing
+        if redacted:
+            self.links.forget(website_host)
+
+            self.logger.warning('Website "%s" links are redacted, snapshot dropped', website_host)
             return
 
-        response = requests.post(
-            f'{self.oauth_issuer}oauth/token',
-            data={
-                'grant_type': 'client_credentials',
-                'client_id': self.oauth_client_id,
-                'client_secret': self.oauth_client_secret,
-                'audience': self.oauth_audience
-            }
-        )
+        # Neither would one missing pages, only a complete snapshot may answer for the host
+        if total is not None and count != total:
+            self.links.forget(website_host)
+
+            self.logger.warning(
+                'Website "%s" links incomplete (%d of %d), snapshot dropped',
+                website_host,
+                count,
+                total
+            )
+            return
+
+        self.logger.info('Website "%s" links loaded (%d)', website_host, len(self.links))
 
-        if not response.ok:
-            raise RuntimeError('Bot authentication failed')
+    def cached(self, kind: str, key: str):
+        return self.cache is not None and self.cache.has(kind, key)
 
-        token = response.json()
+    def cache_get(self, kind: str, key: str):
+        return self.cache.get(kind, key) if self.cache is not None else None
 
-        config = self.client.configuration
-        config.access_token = token['access_token']
-        self.oauth_token_expires = time.time() + float(token['expires_in'])
+    def cache_get_many(self, kind: str, keys: Iterable[str]):
+        return self.cache.get_many(kind, keys) if self.cache is not None else {}
 
-        self.logger.info('ComicBagi Bot authenticated')
+    def cache_add(self, kind: str, key: str, ttl: float | None = None, value: str | None = None):
+        if self.cache is not None:
+            self.cache.add(kind, key, ttl, value)
 
     def note(self, __lines: Iterable[str] | None = None):
         if __lines:
             self.logger.info(__lines)
-            if self.note_file: self.note_file.writelines(__lines)
+            self.audit('note', message=__lines)
 
-        if self.note_file: self.note_file.writelines("\n")
+    def audit(self, action: str, **fields: Any):
+        if self.audit_log:
+            self.audit_log.record(action, **fields)
+
+        self.logger.debug('%s %s', action, fields)
 
     def add_language(
         self,
@@ -140,8 +217,7 @@ class Bot:
             )
         )
 
-        if lang not in self.languages:
-            self.languages.append(lang)
+        self.languages.add(lang)
 
         self.logger.info('Language "%s" added', lang)
 
@@ -163,8 +239,9 @@ class Bot:
             )
         )
 
-        if host not in self.websites:
-            self.websites.append(host)
+        self.websites.add(host)
+
+        self.cache_add(Cache.kind_website, host)
 
         self.logger.info('Website "%s" added', host)
 
@@ -184,6 +261,10 @@ class Bot:
             )
         )
 
+        self.links.add(f'{website_host}{relative_reference or ""}')
+
+        self.cache_add(Cache.kind_link, f'{website_host}{relative_reference or ""}')
+
         self.logger.info('Link "%s" added', f'{website_host}{relative_reference}')
 
         return result
@@ -200,6 +281,8 @@ class Bot:
             )
         )
 
+        self.cache_add(Cache.kind_comic, code)
+
         self.logger.info('Comic "%s" added', code)
 
         return result
@@ -224,6 +307,11 @@ class Bot:
             )
         )
 
+        self.cache_add(
+            Cache.kind_comic_provider,
+            f'{comic_code} {link_website_host}{link_relative_reference or ""} {languageLang or ""}'
+        )
+
         self.logger.info(
             'Comic "%s" Provider "%s" added',
             comic_code, f'{link_website_host}{link_relative_reference}'
@@ -247,8 +335,9 @@ class Bot:
             )
         )
 
-        if f'{comic_code} {number}{version or ""}' not in self.comic_chapters:
-            self.comic_chapters.append(f'{comic_code} {number}{version or ""}')
+        self.comic_chapters.put(comic_code, number, version)
+
+        self.cache_add(Cache.kind_comic_chapter, f'{comic_code} {number}{"+" + version if version else ""}')
 
         self.logger.info(
             'Comic "%s" Chapter "%s" added',
@@ -279,6 +368,11 @@ class Bot:
             )
         )
 
+        self.cache_add(
+            Cache.kind_comic_chapter_provider,
+            f'{comic_code} {chapter_nv} {link_website_host}{link_relative_reference or ""} {languageLang or ""}'
+        )
+
         self.logger.info(
             'Comic "%s" Chapter "%s" Provider "%s" added',
             comic_code, chapter_nv, f'{link_website_host}{link_relative_reference}'
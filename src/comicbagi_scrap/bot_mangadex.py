@@ -1,13 +1,24 @@
 import time
+import zlib
+import asyncio
 import logging
+import threading
 import comicbagi_openapi
 import mangadex_openapi
 import comicking_scrap
-from datetime import datetime
-from typing import Iterable
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable, Iterator
 from urllib.parse import quote
 
 from .bot import Bot
+from .cache import Cache
+from .checkpoint import Checkpoint
+from .paginator import Page, Paginator
+from .plan import Plan
+from .registry import Registry
 
 class BotMangaDex:
     website_mangadex_host = 'mangadex.org'
@@ -16,15 +27,52 @@ class BotMangaDex:
         self,
         bot: Bot,
         comicking_jikan_bot: comicking_scrap.BotJikan | None,
-        logger: logging.Logger
+        logger: logging.Logger,
+        checkpoint: Checkpoint | None = None,
+        preload_links: bool = False,
+        shard: tuple[int, int] | None = None,
+        rejection_ttl: float = 259200,
+        mal_ttl: float = 2592000
     ):
         from mangadex_openapi.api_client import ApiClient as MangaDexApiClient
 
         self.bot = bot
         self.client = MangaDexApiClient()
 
+        self.bot.transport.install(self.client)
+        if self.bot.decoder:
+            self.bot.decoder.install(self.client)
+        if self.bot.metrics:
+            self.bot.metrics.install(self.client)
+        self.bot.rate_limiter.install(self.client)
+
         self.comicking_jikan_bot = comicking_jikan_bot
 
+        self.checkpoint = checkpoint
+
+        self.preload_links = preload_links
+
+        # Complete modes only take the manga hashed to this shard, 1 based index and count
+        self.shard = shard
+
+        # Manga turned away before, remembered across runs through the cache as well
+        self.rejected: Registry[str] = Registry()
+        self.rejection_ttl = rejection_ttl
+
+        # MAL ID to comic code resolved through ComicKing, remembered across runs through the cache as well
+        self.mal_comics: dict[str, str] = {}
+        self.mal_ttl = mal_ttl
+
+        # Comics whose chapters were listed from ComicBagi during this run
+        self.chapters_listed: Registry[str] = Registry(10000)
+
+        # Latest chapter update polled, and the chapters polled at that second, MangaDex returns them again
+        self.watermark: str | None = None
+        self.polled: set[str] = set()
+
+        # Failed attempts per polled chapter, the watermark moves past one failing too often
+        self.poll_failures: dict[str, int] = {}
+
         self.logger = logger
 
     def load(self, seeding: bool = True):
@@ -37,54 +85,317 @@ class BotMangaDex:
 
         api0 = comicbagi_openapi.WebsiteApi(self.bot.client)
 
+        if self.bot.cached(Cache.kind_website, self.website_mangadex_host):
+            self.bot.websites.add(self.website_mangadex_host)
+
         if self.website_mangadex_host not in self.bot.websites:
             try:
                 api0.get_website(self.website_mangadex_host)
 
-                self.bot.websites.append(self.website_mangadex_host)
+                self.bot.websites.add(self.website_mangadex_host)
+                self.bot.cache_add(Cache.kind_website, self.website_mangadex_host)
             except comicbagi_openapi.ApiException as e:
-                if seeding and e.status == 404:
+                if e.status != 404:
+                    raise e
+
+                # Without seeding a missing website is left for the write that needs it
+                if seeding:
                     self.bot.add_website(self.website_mangadex_host, 'MangaDex', True)
 
-                    time.sleep(2)
-                else:
-                    raise e
+        #
+        # Link
+        #
+
+        if self.preload_links and self.website_mangadex_host not in self.bot.links.hosts:
+            self.bot.load_links(self.website_mangadex_host)
 
     def note(self, __lines: Iterable[str] | None = None):
         if __lines:
             self.logger.info(__lines)
-            if self.bot.note_file: self.bot.note_file.writelines(__lines)
+            self.bot.audit('note', message=__lines)
+
+    @contextmanager
+    def __audit(self, action: str, **fields: Any):
+        # One record per check, callers fill in the outcome
+        record = dict(fields)
+
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException:
+            record['outcome'] = 'error'
+            raise
+        finally:
+            self.bot.audit(action, latency=round(time.perf_counter() - started, 6), **record)
 
-        if self.bot.note_file: self.bot.note_file.writelines("\n")
+    def __outcome(self, value: Any, exist: bool):
+        if exist:
+            return 'exists'
+
+        return 'added' if value else 'skipped'
 
     def process(
         self,
         mode: str = 'comic',
         max_new_comic: int | None = None,
-        max_new_comic_chapter: int | None = None
+        max_new_comic_chapter: int | None = None,
+        engine: str = 'sync',
+        workers: int = 4,
+        incremental_since: str | None = None,
+        dry_run: bool = False,
+        plan_path: str | None = None
     ):
-        self.note('#')
-        self.note('# Started time %s' % time.ctime())
-        self.note('#')
-        self.note()
+        self.bot.audit('start', mode=mode, engine=engine, shard='%d/%d' % self.shard if self.shard else None)
+        self.logger.info('Started %s with the %s engine', mode, engine)
+
+        self.load(not dry_run)
+
+        # A dry run only makes sense as a plan, whatever engine is configured
+        match 'plan' if dry_run else (mode if mode == 'incremental' else engine):
+            case 'incremental':
+                self.scrap_comics_incremental(
+                    max_new_comic,
+                    max_new_comic_chapter,
+                    incremental_since
+                )
+            case 'async':
+                asyncio.run(self.scrap_comics_complete_async(
+                    mode,
+                    max_new_comic,
+                    max_new_comic_chapter,
+                    workers
+                ))
+            case 'plan':
+                self.scrap_comics_plan(
+                    mode,
+                    max_new_comic,
+                    max_new_comic_chapter,
+                    dry_run,
+                    plan_path
+                )
+            case 'thread':
+                self.scrap_comics_complete_threaded(
+                    mode,
+                    max_new_comic,
+                    max_new_comic_chapter,
+                    workers
+                )
+            case _:
+                self.scrap_comics_complete(mode, max_new_comic, max_new_comic_chapter)
 
-        self.load(True)
+        self.bot.audit('stop', mode=mode, engine=engine)
+        self.logger.info('Stopped %s', mode)
+
+    def __comics(self, manga_ids: Iterable[str]):
+        manga_ids = list(manga_ids)
+
+        # Manga already mapped to their comics skip the lookup and the per comic provider fan-out
+        comics: dict[str, list[str]] = {
+            k: v.split() for k, v in self.bot.cache_get_many(Cache.kind_manga_comic, manga_ids).items()
+        }
+
+        manga_links: dict[str, str] = {}
+        for manga_id in manga_ids:
+            if manga_id not in comics:
+                manga_links[f'/title/{manga_id}'] = manga_id
+
+        if not manga_links:
+            return comics
+
+        api0 = comicbagi_openapi.ComicApi(self.bot.client)
+
+        comic_hrefs = [quote(f'{self.website_mangadex_host}{k}') for k in manga_links]
+
+        response0 = self.bot.list_complete(
+            api0.list_comic_with_http_info,
+            limit=len(comic_hrefs),
+            provider_link_href=comic_hrefs
+        )
+
+        if len(response0) < 1:
+            return comics
+
+        if len(manga_links) < 2:
+            for manga_id in manga_links.values():
+                comics[manga_id] = [comic.code for comic in response0]
+                self.bot.cache_add(Cache.kind_manga_comic, manga_id, value=' '.join(comics[manga_id]))
+            return comics
+
+        # Comic schema does not carry provider links, map them back by provider, references unredacted
+        for comic in response0:
+            response01 = self.bot.list_complete(
+                api0.list_comic_provider_with_http_info,
+                comic.code,
+                limit=len(comic_hrefs),
+                link_href=comic_hrefs,
+                unredact=[self.website_mangadex_host]
+            )
+
+            for comic_provider in response01:
+                if comic_provider.link_website_host != self.website_mangadex_host:
+                    continue
+
+                manga_id = manga_links.get(comic_provider.link_relative_reference)
+                if not manga_id:
+                    continue
+
+                comic_codes = comics.setdefault(manga_id, [])
+                if comic.code not in comic_codes:
+                    comic_codes.append(comic.code)
+
+        for manga_id in manga_links.values():
+            if manga_id in comics:
+                self.bot.cache_add(Cache.kind_manga_comic, manga_id, value=' '.join(comics[manga_id]))
+
+        return comics
+
+    def __mangas(
+        self,
+        manga_ids: Iterable[str],
+        mangas: dict[str, mangadex_openapi.Manga],
+        chapters: Iterable[mangadex_openapi.Chapter] = ()
+    ):
+        api1 = mangadex_openapi.MangaApi(self.client)
+
+        # Chapters listed with includes[]=manga carry their manga already
+        for chapter in chapters:
+            for relationship in chapter.relationships or []:
+                if relationship.type != 'manga' or not relationship.attributes or relationship.id in mangas:
+                    continue
+
+                manga_from_dict = self.bot.decoder.manga if self.bot.decoder else mangadex_openapi.Manga.from_dict
+
+                mangas[relationship.id] = manga_from_dict({
+                    'id': relationship.id,
+                    'type': 'manga',
+                    'attributes': relationship.attributes,
+                    'relationships': []
+                })
+
+        manga_ids = [manga_id for manga_id in dict.fromkeys(manga_ids) if manga_id not in mangas]
+
+        # MangaDex limits ids[] to 100 per request
+        for i in range(0, len(manga_ids), 100):
+            response = api1.get_search_manga(
+                limit=100,
+                ids=manga_ids[i:i+100],
+                content_rating=['safe', 'suggestive', 'erotica', 'pornographic']
+            )
+            if not response.data:
+                continue
+
+            for manga in response.data:
+                if manga.id:
+                    mangas[manga.id] = manga
+
+        return mangas
+
+    def __languages(self):
+        # Chapters in a language ComicBagi does not carry are dropped anyway, leave them on MangaDex
+        return sorted(self.bot.languages) or None
+
+    def __feed_order(self):
+        # Oldest first keeps feed offsets saved in the checkpoint valid as chapters are added,
+        # the feed parameters are shared with the follows feed and so is their generated model
+        return mangadex_openapi.GetUserFollowsMangaFeedOrderParameter(created_at='asc')
+
+    def __feed_marker(self):
+        # Feed offsets only hold for the order and language filter they were saved under
+        return f'created_at {",".join(self.__languages() or [])}'
+
+    def __listing_marker(self, mode: str):
+        # The chapter listing is filtered by language as well, so are its offsets
+        return self.__feed_marker() if mode == 'comic-chapter' else 'created_at'
+
+    def __chapter_manga_id(self, chapter: mangadex_openapi.Chapter):
+        if chapter.relationships:
+            for relationship in chapter.relationships:
+                if relationship.type == 'manga':
+                    return relationship.id
+
+        return None
+
+    def __warm_mal(self, mangas: Iterable[mangadex_openapi.Manga], comics: dict[str, list[str]]):
+        mal_ids: list[str] = []
+        for manga in mangas:
+            if not manga.id or manga.id in comics or not manga.attributes:
+                continue
 
-        self.scrap_comics_complete(mode, max_new_comic, max_new_comic_chapter)
+            mal_id = (manga.attributes.links or {}).get('mal')
+            if mal_id and str(mal_id) not in self.mal_comics:
+                mal_ids.append(str(mal_id))
 
-        self.note()
-        self.note('# Stopped time %s' % time.ctime())
-        self.note()
+        # One lookup for the whole page instead of one per new manga
+        if mal_ids:
+            self.mal_comics.update(self.bot.cache_get_many(Cache.kind_mal_comic, mal_ids))
 
-    def __manga(self, manga: mangadex_openapi.Manga):
+    def __resolution_key(self, manga: mangadex_openapi.Manga):
+        mal_id = (manga.attributes.links or {}).get('mal') if manga.attributes else None
+        if mal_id:
+            return f'mal {mal_id}'
+
+        return f'manga {manga.id}'
+
+    def __resolve_mal(self, manga: mangadex_openapi.Manga, mal_id: str):
+        comic_code = self.mal_comics.get(mal_id) or self.bot.cache_get(Cache.kind_mal_comic, mal_id)
+        if comic_code:
+            self.mal_comics[mal_id] = comic_code
+            return comic_code
+
+        if not self.comicking_jikan_bot:
+            return None
+
+        with self.__audit('comicking', manga=manga.id, mal=mal_id) as record:
+            comic_code = self.comicking_jikan_bot.get_or_add_comic_complete(int(mal_id))
+
+            record['comic'] = comic_code
+            record['outcome'] = 'resolved' if comic_code else 'unresolved'
+
+        time.sleep(3)
+
+        if comic_code:
+            self.mal_comics[mal_id] = comic_code
+            self.bot.cache_add(Cache.kind_mal_comic, mal_id, self.mal_ttl, comic_code)
+
+        return comic_code
+
+    def __rejection_key(self, manga: mangadex_openapi.Manga):
+        manga_attributes = manga.attributes
+
+        manga_languages: list[str] = []
+        if manga_attributes and manga_attributes.available_translated_languages:
+            manga_languages = sorted(manga_attributes.available_translated_languages)
+
+        # A manga update, a new ComicBagi language or a newly translated one may change the verdict,
+        # chapters in a new language do not always bump updated_at
+        languages = zlib.crc32(f'{",".join(sorted(self.bot.languages))} {",".join(manga_languages)}'.encode())
+
+        return f'{manga.id} {manga_attributes.updated_at if manga_attributes else None} {languages:08x}'
+
+    def __rejected(self, manga: mangadex_openapi.Manga, kind: str):
+        key = self.__rejection_key(manga)
+
+        return f'{kind} {key}' in self.rejected or self.bot.cached(kind, key)
+
+    def __reject(self, manga: mangadex_openapi.Manga, kind: str):
+        key = self.__rejection_key(manga)
+
+        self.rejected.add(f'{kind} {key}')
+        self.bot.cache_add(kind, key, self.rejection_ttl)
+
+    def __manga(self, manga: mangadex_openapi.Manga, comics: dict[str, list[str]]):
         comic_code, comic_exist = None, False
 
         if not manga.id:
             return comic_code, comic_exist
 
+        if self.__rejected(manga, Cache.kind_manga_unsupported):
+            return comic_code, comic_exist
+
         manga_attributes = manga.attributes
 
         if not manga_attributes or not manga_attributes.available_translated_languages:
+            self.__reject(manga, Cache.kind_manga_unsupported)
             return comic_code, comic_exist
 
         manga_language_supported = False
@@ -95,6 +406,7 @@ class BotMangaDex:
                 break
 
         if not manga_language_supported:
+            self.__reject(manga, Cache.kind_manga_unsupported)
             return comic_code, comic_exist
 
         self.bot.authenticate()
@@ -102,14 +414,13 @@ class BotMangaDex:
         # Comic
 
         api0 = comicbagi_openapi.ComicApi(self.bot.client)
-
-        response0 = api0.list_comic(
-            provider_link_href=[quote(f'{self.website_mangadex_host}/title/{manga.id}')]
-        )
-
         api1 = comicbagi_openapi.LinkApi(self.bot.client)
 
-        if len(response0) < 1:
+        if manga.id not in comics:
+            # A comic linked by hand since still shows up in comics
+            if self.__rejected(manga, Cache.kind_manga_unresolved):
+                return comic_code, comic_exist
+
             if manga_attributes.links:
                 for k, v in manga_attributes.links.items():
                     if comic_code:
@@ -117,53 +428,77 @@ class BotMangaDex:
 
                     match k:
                         case 'mal':
-                            self.note('=== ComicKing Scrap ===')
-
                             if not self.comicking_jikan_bot:
                                 continue
 
-                            comic_code = self.comicking_jikan_bot.get_or_add_comic_complete(int(v))
-
-                            self.note('=== ComicKing Scrap ===')
-
-                            time.sleep(3)
+                            comic_code = self.__resolve_mal(manga, str(v))
                         case _:
                             continue
 
             if not comic_code:
                 self.note('No information provider supported.')
+
+                if self.comicking_jikan_bot:
+                    self.__reject(manga, Cache.kind_manga_unresolved)
+
                 return comic_code, comic_exist
 
-            try:
-                api0.get_comic(comic_code)
-            except comicbagi_openapi.ApiException as e:
-                if e.status == 404:
-                    self.bot.add_comic(comic_code)
+            # Manga sharing a MAL id may be resolved at the same time by another worker or shard
+            if not self.bot.cached(Cache.kind_comic, comic_code):
+                try:
+                    api0.get_comic(comic_code)
 
-                    time.sleep(2)
-                else:
-                    raise e
+                    self.bot.cache_add(Cache.kind_comic, comic_code)
+                except comicbagi_openapi.ApiException as e:
+                    if e.status != 404:
+                        raise e
+
+                    if not self.__write(self.bot.add_comic, comic_code):
+                        self.bot.cache_add(Cache.kind_comic, comic_code)
 
             # Comic Provider
 
             comic_link = f'{self.website_mangadex_host}/title/{manga.id}'
 
-            try:
-                api1.get_link(comic_link)
-            except comicbagi_openapi.ApiException as e:
-                if e.status == 404:
-                    self.bot.add_link(self.website_mangadex_host, f'/title/{manga.id}')
+            # The startup snapshot answers for every MangaDex link, nothing to probe
+            if self.bot.links.covers(comic_link):
+                if comic_link not in self.bot.links:
+                    if not self.__write(self.bot.add_link, self.website_mangadex_host, f'/title/{manga.id}'):
+                        self.bot.links.add(comic_link)
+            elif not self.bot.cached(Cache.kind_link, comic_link):
+                try:
+                    api1.get_link(comic_link)
 
-                    time.sleep(2)
-                else:
-                    raise e
+                    self.bot.cache_add(Cache.kind_link, comic_link)
+                except comicbagi_openapi.ApiException as e:
+                    if e.status != 404:
+                        raise e
 
-            response01 = api0.list_comic_provider(comic_code, link_href=[quote(comic_link)])
+                    if not self.__write(self.bot.add_link, self.website_mangadex_host, f'/title/{manga.id}'):
+                        self.bot.cache_add(Cache.kind_link, comic_link)
 
+            comic_provider_languages: list[str] = []
             for manga_language in manga_attributes.available_translated_languages:
                 if manga_language not in self.bot.languages:
                     continue
 
+                if self.bot.cached(Cache.kind_comic_provider, f'{comic_code} {comic_link} {manga_language}'):
+                    continue
+
+                comic_provider_languages.append(manga_language)
+
+            response01 = []
+            if comic_provider_languages:
+                response01 = api0.list_comic_provider(comic_code, link_href=[quote(comic_link)])
+
+            for comic_provider in response01:
+                if comic_provider.language_lang:
+                    self.bot.cache_add(
+                        Cache.kind_comic_provider,
+                        f'{comic_code} {comic_link} {comic_provider.language_lang}'
+                    )
+
+            for manga_language in comic_provider_languages:
                 comic_provider_exist = False
                 for comic_provider in response01:
                     if manga_language == comic_provider.language_lang:
@@ -177,20 +512,23 @@ class BotMangaDex:
                 if manga_attributes.created_at:
                     comic_released_at = datetime.fromisoformat(manga_attributes.created_at)
 
-                self.bot.add_comic_provider(
+                if not self.__write(
+                    self.bot.add_comic_provider,
                     comic_code,
                     self.website_mangadex_host,
                     f'/title/{manga.id}',
                     manga_language,
                     comic_released_at
-                )
+                ):
+                    self.bot.cache_add(Cache.kind_comic_provider, f'{comic_code} {comic_link} {manga_language}')
 
-                time.sleep(2)
+            comics[manga.id] = [comic_code]
+            self.bot.cache_add(Cache.kind_manga_comic, manga.id, value=comic_code)
         else:
-            if len(response0) > 1:
+            if len(comics[manga.id]) > 1:
                 self.note('Detected multiple comic with same MangaDex ID %s' % manga.id)
 
-            comic_code, comic_exist = response0[0].code, True
+            comic_code, comic_exist = comics[manga.id][0], True
 
         return comic_code, comic_exist
 
@@ -220,11 +558,18 @@ class BotMangaDex:
         except ValueError:
             pass
 
-        if f'{comic_code} {chapter_number}' not in self.bot.comic_chapters:
+        if self.bot.cached(Cache.kind_comic_chapter, f'{comic_code} {chapter_number}'):
+            if not self.bot.comic_chapters.has(comic_code, chapter_number):
+                self.bot.comic_chapters.put(comic_code, chapter_number)
+
+                chapter_exist = True
+
+        if not self.bot.comic_chapters.has(comic_code, chapter_number):
             try:
                 api0.get_comic_chapter(comic_code, str(chapter_number))
 
-                self.bot.comic_chapters.append(f'{comic_code} {chapter_number}')
+                self.bot.comic_chapters.put(comic_code, chapter_number)
+                self.bot.cache_add(Cache.kind_comic_chapter, f'{comic_code} {chapter_number}')
 
                 chapter_exist = True
             except comicbagi_openapi.ApiException as e:
@@ -234,8 +579,6 @@ class BotMangaDex:
                         chapter_number,
                         None
                     )
-
-                    time.sleep(2)
                 else:
                     raise e
 
@@ -245,29 +588,39 @@ class BotMangaDex:
 
         api1 = comicbagi_openapi.LinkApi(self.bot.client)
 
-        chapter_link = quote(f'{self.website_mangadex_host}/chapter/{chapter.id}')
+        chapter_href = f'{self.website_mangadex_host}/chapter/{chapter.id}'
+        chapter_link = quote(chapter_href)
 
-        try:
-            api1.get_link(chapter_link)
-        except comicbagi_openapi.ApiException as e:
-            if e.status == 404:
+        if self.bot.links.covers(chapter_href):
+            if chapter_href not in self.bot.links:
                 self.bot.add_link(self.website_mangadex_host, f'/chapter/{chapter.id}')
+        elif not self.bot.cached(Cache.kind_link, chapter_href):
+            try:
+                api1.get_link(chapter_link)
 
-                time.sleep(2)
-            else:
-                raise e
+                self.bot.cache_add(Cache.kind_link, chapter_href)
+            except comicbagi_openapi.ApiException as e:
+                if e.status == 404:
+                    self.bot.add_link(self.website_mangadex_host, f'/chapter/{chapter.id}')
+                else:
+                    raise e
 
-        response = api0.list_comic_chapter_provider(
-            comic_code,
-            chapter_nv,
-            link_href=[quote(chapter_link)]
-        )
+        chapter_provider_key = f'{comic_code} {chapter_nv} {chapter_href} {chapter_language}'
 
-        chapter_provider_exist = False
-        for chapter_provider in response:
-            if chapter_attributes.translated_language == chapter_provider.language_lang:
-                chapter_provider_exist = True
-                break
+        chapter_provider_exist = self.bot.cached(Cache.kind_comic_chapter_provider, chapter_provider_key)
+        if not chapter_provider_exist:
+            response = api0.list_comic_chapter_provider(
+                comic_code,
+                chapter_nv,
+                link_href=[quote(chapter_link)]
+            )
+
+            for chapter_provider in response:
+                if chapter_attributes.translated_language == chapter_provider.language_lang:
+                    chapter_provider_exist = True
+
+                    self.bot.cache_add(Cache.kind_comic_chapter_provider, chapter_provider_key)
+                    break
 
         if not chapter_provider_exist:
             chapter_released_at = datetime.now()
@@ -283,146 +636,1293 @@ class BotMangaDex:
                 chapter_released_at
             )
 
-            time.sleep(2)
-
         return chapter_nv, chapter_exist
 
+    def __manga_feed(
+        self,
+        manga_id: str,
+        comic_code: str,
+        max_comic_chapter: int | None = None,
+        mode: str = 'comic'
+    ):
+        api0 = mangadex_openapi.MangaApi(self.client)
+
+        total_comic_chapter = 0
+
+        feed_marker = self.__feed_marker()
+
+        offset = 0
+        if self.checkpoint:
+            checkpoint = self.checkpoint.get(mode)
+            if checkpoint.get('feeds_order') == feed_marker:
+                offset = checkpoint.get('feeds', {}).get(manga_id, 0)
+
+        for page in Paginator(
+            api0.get_manga_id_feed,
+            manga_id,
+            limit=30,
+            offset=offset,
+            translated_language=self.__languages(),
+            include_future_updates='0',
+            include_empty_pages=0,
+            order=self.__feed_order()
+        ).pages():
+            if max_comic_chapter and total_comic_chapter > max_comic_chapter - 1:
+                break
+
+            comic_chapters = [comic_chapter for comic_chapter in page.data if comic_chapter.id]
+            if max_comic_chapter:
+                comic_chapters = comic_chapters[:max_comic_chapter - total_comic_chapter]
+
+            total_comic_chapter += len(self.__reconcile(manga_id, comic_code, comic_chapters))
+
+            if self.checkpoint:
+                self.checkpoint.feed(mode, manga_id, page.next_offset, feed_marker)
+
+        if self.checkpoint:
+            self.checkpoint.feed(mode, manga_id, None, feed_marker)
+
+        return total_comic_chapter
+
+    def __chapter_complete(
+        self,
+        chapter: mangadex_openapi.Chapter,
+        mangas: dict[str, mangadex_openapi.Manga],
+        comics: dict[str, list[str]]
+    ):
+        api1 = mangadex_openapi.MangaApi(self.client)
+
+        comic_code, comic_exist = None, False
+
+        manga_id = self.__chapter_manga_id(chapter)
+        if not manga_id:
+            return comic_code, comic_exist
+
+        with self.__audit('manga', manga=manga_id) as record:
+            record['outcome'] = 'skipped'
+
+            if manga_id not in mangas:
+                response1 = api1.get_manga_id(manga_id)
+                if not response1.data:
+                    return comic_code, comic_exist
+
+                mangas[manga_id] = response1.data
+
+            comic_code, comic_exist = self.__manga(mangas[manga_id], comics)
+
+            record['comic'] = comic_code
+            record['outcome'] = self.__outcome(comic_code, comic_exist)
+
+        if comic_code:
+            with self.__audit('chapter', manga=manga_id, chapter=chapter.id, comic=comic_code) as record:
+                record['outcome'] = self.__outcome(*self.__manga_chapter(comic_code, chapter))
+
+        return comic_code, comic_exist
+
+    def __checkpoint_resume(self, mode: str) -> tuple[int, str | None, str | None]:
+        if not self.checkpoint:
+            return 0, None, None
+
+        checkpoint = self.checkpoint.get(mode)
+
+        # Offsets kept under another order or language filter point somewhere else
+        if checkpoint.get('order') != self.__listing_marker(mode):
+            return 0, None, None
+
+        return checkpoint.get('offset', 0), checkpoint.get('since'), checkpoint.get('id')
+
+    def __checkpoint_item(self, mode: str, page: Page, id: str):
+        if self.checkpoint:
+            self.checkpoint.update(
+                mode,
+                order=self.__listing_marker(mode),
+                offset=page.offset,
+                since=page.since,
+                id=id
+            )
+
+    def __checkpoint_page(self, mode: str, page: Page):
+        if self.checkpoint:
+            self.checkpoint.update(
+                mode,
+                order=self.__listing_marker(mode),
+                offset=page.next_offset,
+                since=page.next_since,
+                id=None
+            )
+
+    def __sharded(self, manga_id: str | None):
+        if not self.shard or not manga_id:
+            return True
+
+        index, count = self.shard
+
+        return zlib.crc32(manga_id.encode()) % count == index - 1
+
+    def __listing(self, mode: str, offset: int = 0, since: str | None = None) -> Iterator[Page]:
+        # Oldest first so paging past the offset cap can carry on from a creation time
+        match mode:
+            case 'comic-chapter':
+                paginator = Paginator(
+                    mangadex_openapi.ChapterApi(self.client).get_chapter,
+                    limit=30,
+                    offset=offset,
+                    since=since,
+                    cursor='created_at_since',
+                    cursor_field='created_at',
+                    translated_language=self.__languages(),
+                    include_future_updates='0',
+                    include_empty_pages=0,
+                    includes=['manga'],
+                    order=mangadex_openapi.GetChapterOrderParameter(created_at='asc')
+                )
+            case _:
+                paginator = Paginator(
+                    mangadex_openapi.MangaApi(self.client).get_search_manga,
+                    limit=10,
+                    offset=offset,
+                    since=since,
+                    cursor='created_at_since',
+                    cursor_field='created_at',
+                    has_available_chapters='1',
+                    order=mangadex_openapi.GetSearchMangaOrderParameter(created_at='asc')
+                )
+
+        for page in paginator.pages():
+            # Shards keep every chapter of a manga together so no two create the same comic
+            if self.shard:
+                page.data = [
+                    item for item in page.data
+                    if self.__sharded(self.__chapter_manga_id(item) if mode == 'comic-chapter' else item.id)
+                ]
+
+            yield page
+
     def scrap_comics_complete(
         self,
         mode: str = 'comic',
         max_comic: int | None = None,
         max_comic_chapter: int | None = None
     ):
-        api1 = mangadex_openapi.MangaApi(self.client)
-        api2 = mangadex_openapi.ChapterApi(self.client)
-
         total_comic = 0
 
-        page = 1
-        while True:
+        mangas: dict[str, mangadex_openapi.Manga] = {}
+
+        offset, since, checkpoint_id = self.__checkpoint_resume(mode)
+        for page in self.__listing(mode, offset, since):
             if max_comic and total_comic > max_comic - 1:
                 break
 
+            # Skip what the interrupted run already finished on this page
+            skip = 0
+            for i, item in enumerate(page.data):
+                if checkpoint_id and item.id == checkpoint_id:
+                    skip = i + 1
+
+            checkpoint_id = None
+
             match mode:
                 case 'comic-chapter':
-                    response = api2.get_chapter(
-                        limit=30,
-                        offset=(page-1)*30,
-                        include_future_updates='0',
-                        include_empty_pages=0
-                    )
-                    if not response.data:
-                        break
+                    manga_ids = [
+                        manga_id for manga_id in map(self.__chapter_manga_id, page.data)
+                        if manga_id
+                    ]
 
-                    for comic_chapter in response.data:
+                    self.__mangas(manga_ids, mangas, page.data)
+
+                    comics = self.__comics(manga_ids)
+                    self.__warm_mal((mangas[k] for k in manga_ids if k in mangas), comics)
+
+                    for comic_chapter in page.data[skip:]:
                         if max_comic and total_comic > max_comic - 1:
                             break
 
                         if not comic_chapter.id:
                             continue
 
-                        self.note()
-                        self.note('Check MangaDex chapter ID %s' % comic_chapter.id)
-
-                        manga_id = None
-                        if comic_chapter.relationships:
-                            for relationship in comic_chapter.relationships:
-                                if relationship.type == 'manga':
-                                    manga_id = relationship.id
-                                    break
- 
-                        if not manga_id:
-                            continue
+                        comic_code, comic_exist = self.__chapter_complete(comic_chapter, mangas, comics)
+
+                        self.__checkpoint_item(mode, page, comic_chapter.id)
 
-                        self.note('Check MangaDex manga ID %s' % manga_id)
+                        if comic_code and not comic_exist:
+                            total_comic += 1
+                    else:
+                        self.__checkpoint_page(mode, page)
+                case _:
+                    comics = self.__comics(manga.id for manga in page.data if manga.id)
+                    self.__warm_mal(page.data, comics)
+
+                    for manga in page.data[skip:]:
+                        if max_comic and total_comic > max_comic - 1:
+                            break
 
-                        response1 = api1.get_manga_id(manga_id)
-                        if not response1.data:
+                        if not manga.id:
                             continue
 
-                        comic_code, comic_exist = self.__manga(response1.data)
-                        time.sleep(3)
+                        with self.__audit('manga', manga=manga.id) as record:
+                            comic_code, comic_exist = self.__manga(manga, comics)
 
-                        self.note("MangaDex manga ID %s check complete" % manga_id)
+                            record['comic'] = comic_code
+                            record['outcome'] = self.__outcome(comic_code, comic_exist)
 
                         if comic_code:
-                            self.__manga_chapter(comic_code, comic_chapter)
+                            self.__manga_feed(manga.id, comic_code, max_comic_chapter)
 
-                        self.note("MangaDex chapter ID %s check complete" % comic_chapter.id)
-                        self.note()
+                        self.__checkpoint_item(mode, page, manga.id)
 
                         if comic_code and not comic_exist:
                             total_comic += 1
-                            time.sleep(5)
-                case _:
-                    response = api1.get_search_manga(
-                        limit=10,
-                        offset=(page-1)*10,
-                        has_available_chapters='1'
-                    )
-                    if not response.data:
-                        break
+                    else:
+                        self.__checkpoint_page(mode, page)
 
-                    for manga in response.data:
-                        if max_comic and total_comic > max_comic - 1:
-                            break
+    def __since(self, timestamp: str | None):
+        if not timestamp:
+            return None
 
-                        if not manga.id:
-                            continue
+        return datetime.fromisoformat(timestamp).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
 
-                        self.note()
-                        self.note('Check MangaDex manga ID %s' % manga.id)
+    def scrap_comics_incremental(
+        self,
+        max_comic: int | None = None,
+        max_comic_chapter: int | None = None,
+        since: str | None = None
+    ):
+        mode = 'incremental'
 
-                        comic_code, comic_exist = self.__manga(manga)
-                        time.sleep(3)
+        api1 = mangadex_openapi.MangaApi(self.client)
+        api2 = mangadex_openapi.ChapterApi(self.client)
 
-                        if comic_code:
-                            total_comic_chapter = 0
-
-                            page1 = 1
-                            while True:
-                                if max_comic_chapter and total_comic_chapter > max_comic_chapter - 1:
-                                    break
-
-                                response1 = api1.get_manga_id_feed(
-                                    manga.id,
-                                    limit=30,
-                                    offset=(page1-1)*30,
-                                    include_future_updates='0',
-                                    include_empty_pages=0
-                                )
-                                if not response1.data:
-                                    break
+        started = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
 
-                                for comic_chapter in response1.data:
-                                    if max_comic_chapter and total_comic_chapter > max_comic_chapter - 1:
-                                        break
+        checkpoint = self.checkpoint.get(mode) if self.checkpoint else {}
+        if not self.checkpoint:
+            self.note('No checkpoint configured, incremental watermark will not be kept.')
 
-                                    if not comic_chapter.id:
-                                        continue
+        total_comic = 0
 
-                                    self.note('Check MangaDex chapter ID %s' % comic_chapter.id)
+        mangas: dict[str, mangadex_openapi.Manga] = {}
 
-                                    comic_chapter_nv, comic_chapter_exist = self.__manga_chapter(
-                                        comic_code,
-                                        comic_chapter
-                                    )
+        #
+        # Manga
+        #
 
-                                    self.note("MangaDex chapter ID %s check complete" % comic_chapter.id)
+        manga_since = checkpoint.get('manga') or since
+        self.note('Check MangaDex manga updated since %s' % (manga_since or 'the beginning'))
+
+        # Ascending order lets the watermark follow each processed manga
+        paginator = Paginator(
+            api1.get_search_manga,
+            limit=10,
+            since=manga_since,
+            cursor='updated_at_since',
+            cursor_field='updated_at',
+            paging='cursor',
+            has_available_chapters='1',
+            order=mangadex_openapi.GetSearchMangaOrderParameter(updated_at='asc')
+        )
+        for page in paginator.pages():
+            if max_comic and total_comic > max_comic - 1:
+                break
 
-                                    if comic_chapter_nv or not comic_chapter_exist:
-                                        total_comic_chapter += 1
-                                        time.sleep(5)
+            comics = self.__comics(manga.id for manga in page.data if manga.id)
+            self.__warm_mal(page.data, comics)
 
-                                page1 += 1
-                                time.sleep(3)
+            for manga in page.data:
+                if max_comic and total_comic > max_comic - 1:
+                    break
 
-                        self.note("MangaDex manga ID %s check complete" % manga.id)
-                        self.note()
+                if not manga.id:
+                    continue
 
-                        if comic_code and not comic_exist:
-                            total_comic += 1
-                            time.sleep(5)
+                with self.__audit('manga', manga=manga.id) as record:
+                    comic_code, comic_exist = self.__manga(manga, comics)
+
+                    record['comic'] = comic_code
+                    record['outcome'] = self.__outcome(comic_code, comic_exist)
+
+                # Chapters of an already known comic arrive through the chapter delta
+                if comic_code and not comic_exist:
+                    self.__manga_feed(manga.id, comic_code, max_comic_chapter, mode)
+
+                if comic_code and not comic_exist:
+                    total_comic += 1
+
+                if manga.attributes and manga.attributes.updated_at:
+                    manga_since = self.__since(manga.attributes.updated_at)
+
+                    if self.checkpoint:
+                        self.checkpoint.update(mode, manga=manga_since)
+        else:
+            # Everything up to the start of this run is in, once the cursor really ran dry
+            if self.checkpoint and not paginator.truncated and not (max_comic and total_comic > max_comic - 1):
+                self.checkpoint.update(mode, manga=started)
+
+        #
+        # Chapter
+        #
+
+        chapter_since = checkpoint.get('chapter') or since
+        self.note('Check MangaDex chapter updated since %s' % (chapter_since or 'the beginning'))
+
+        paginator = Paginator(
+            api2.get_chapter,
+            limit=30,
+            since=chapter_since,
+            cursor='updated_at_since',
+            cursor_field='updated_at',
+            paging='cursor',
+            translated_language=self.__languages(),
+            include_future_updates='0',
+            include_empty_pages=0,
+            includes=['manga'],
+            order=mangadex_openapi.GetChapterOrderParameter(updated_at='asc')
+        )
+        for page in paginator.pages():
+            if max_comic and total_comic > max_comic - 1:
+                break
+
+            manga_ids = [
+                manga_id for manga_id in map(self.__chapter_manga_id, page.data)
+                if manga_id
+            ]
+
+            self.__mangas(manga_ids, mangas, page.data)
+
+            comics = self.__comics(manga_ids)
+            self.__warm_mal((mangas[k] for k in manga_ids if k in mangas), comics)
+
+            for comic_chapter in page.data:
+                if max_comic and total_comic > max_comic - 1:
+                    break
+
+                if not comic_chapter.id:
+                    continue
+
+                comic_code, comic_exist = self.__chapter_complete(comic_chapter, mangas, comics)
+
+                if comic_code and not comic_exist:
+                    total_comic += 1
+
+                if comic_chapter.attributes and comic_chapter.attributes.updated_at:
+                    chapter_since = self.__since(comic_chapter.attributes.updated_at)
+
+                    if self.checkpoint:
+                        self.checkpoint.update(mode, chapter=chapter_since)
+        else:
+            if self.checkpoint and not paginator.truncated and not (max_comic and total_comic > max_comic - 1):
+                self.checkpoint.update(mode, chapter=started)
+
+    def serve(
+        self,
+        stopped: threading.Event,
+        interval: float = 60,
+        since: str | None = None,
+        attempts: int = 3,
+        max_comic: int | None = None
+    ):
+        mode = 'serve'
+
+        self.bot.audit('start', mode=mode)
+        self.logger.info('Started %s, polling every %gs', mode, interval)
+
+        self.load(True)
+
+        checkpoint = self.checkpoint.get(mode) if self.checkpoint else {}
+
+        # Catching up on older chapters is left to the other modes
+        self.watermark = checkpoint.get('chapter') or since or datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+        while not stopped.is_set():
+            # A failed poll keeps whatever it got through
+            try:
+                self.__poll(mode, stopped, attempts, max_comic)
+            except Exception as e:
+                self.logger.warning('Poll failed: %s', e)
+
+            stopped.wait(interval)
+
+        self.bot.audit('stop', mode=mode)
+        self.logger.info('Stopped %s', mode)
+
+    def __poll(self, mode: str, stopped: threading.Event, attempts: int = 3, max_comic: int | None = None):
+        api2 = mangadex_openapi.ChapterApi(self.client)
+
+        total_comic = 0
+
+        mangas: dict[str, mangadex_openapi.Manga] = {}
+
+        for page in Paginator(
+            api2.get_chapter,
+            limit=100,
+            since=self.watermark,
+            cursor='updated_at_since',
+            cursor_field='updated_at',
+            paging='cursor',
+            translated_language=self.__languages(),
+            include_future_updates='0',
+            include_empty_pages=0,
+            includes=['manga'],
+            order=mangadex_openapi.GetChapterOrderParameter(updated_at='asc')
+        ).pages():
+            comic_chapters = [
+                comic_chapter for comic_chapter in page.data
+                if comic_chapter.id and comic_chapter.id not in self.polled
+            ]
+
+            manga_ids = [
+                manga_id for manga_id in map(self.__chapter_manga_id, comic_chapters)
+                if manga_id
+            ]
+
+            self.__mangas(manga_ids, mangas, comic_chapters)
+
+            comics = self.__comics(manga_ids)
+            self.__warm_mal((mangas[k] for k in manga_ids if k in mangas), comics)
+
+            for comic_chapter in comic_chapters:
+                if stopped.is_set():
+                    return
+
+                # The rest waits for the next poll, which may add as many comics again
+                if max_comic and total_comic > max_comic - 1:
+                    return
+
+                try:
+                    comic_code, comic_exist = self.__chapter_complete(comic_chapter, mangas, comics)
+
+                    if comic_code and not comic_exist:
+                        total_comic += 1
+
+                    self.poll_failures.pop(comic_chapter.id, None) # type: ignore[arg-type]
+                except Exception as e:
+                    failures = self.poll_failures.get(comic_chapter.id, 0) + 1 # type: ignore[arg-type]
+                    if failures < attempts:
+                        self.poll_failures[comic_chapter.id] = failures # type: ignore[index]
+                        raise e
+
+                    # Every poll would stop at this chapter again, give up on it instead of wedging
+                    self.poll_failures.pop(comic_chapter.id, None) # type: ignore[arg-type]
+
+                    self.logger.error('Chapter "%s" failed %d times, skipped: %s', comic_chapter.id, failures, e)
+                    self.bot.audit('chapter', chapter=comic_chapter.id, outcome='abandoned', error=str(e))
+
+                timestamp = self.__since(comic_chapter.attributes.updated_at if comic_chapter.attributes else None)
+                if timestamp and timestamp != self.watermark:
+                    self.watermark = timestamp
+
+                    self.polled.clear()
+
+                self.polled.add(comic_chapter.id) # type: ignore[arg-type]
+
+                if self.checkpoint:
+                    self.checkpoint.update(mode, chapter=self.watermark)
+
+    async def scrap_comics_complete_async(
+        self,
+        mode: str = 'comic',
+        max_comic: int | None = None,
+        max_comic_chapter: int | None = None,
+        workers: int = 4
+    ):
+        api1 = mangadex_openapi.MangaApi(self.client)
+
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(workers * 2))
+
+        total_comic = 0
+        reserved_comic = 0
+
+        mangas: dict[str, mangadex_openapi.Manga] = {}
+        comics: dict[str, list[str]] = {}
+
+        # Discovery -> resolution -> upsert, bounded so paging never runs far ahead
+        queue0: asyncio.Queue[tuple[int, str, list[mangadex_openapi.Chapter] | None] | None] = asyncio.Queue(workers * 2)
+        queue1: asyncio.Queue[tuple[int, str, str, list[mangadex_openapi.Chapter] | None] | None] = asyncio.Queue(workers * 2)
+
+        # Items still in flight per page, a page is checkpointed once it and all before it are done
+        pages: dict[int, int] = {}
+        listed: dict[int, Page] = {}
+
+        def complete(page: int | None = None):
+            if page is not None:
+                pages[page] -= 1
+
+            while pages:
+                page0, pending = next(iter(pages.items()))
+                if pending > 0:
+                    break
+
+                del pages[page0]
+
+                self.__checkpoint_page(mode, listed.pop(page0))
+
+        stopped = asyncio.Event()
+
+        # Only reserving a max_comic slot is serialised, manga sharing a MAL id are resolved one at a time
+        comic_slots = asyncio.Condition()
+        comic_resolving: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        manga_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        comic_locks: defaultdict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+        async def discover():
+            offset, since, _ = self.__checkpoint_resume(mode)
+            listing = self.__listing(mode, offset, since)
+
+            page = 0
+            while not stopped.is_set():
+                listing_page = await asyncio.to_thread(next, listing, None)
+                if not listing_page:
+                    break
+
+                page += 1
+                listed[page] = listing_page
+
+                match mode:
+                    case 'comic-chapter':
+                        manga_chapters: dict[str, list[mangadex_openapi.Chapter]] = {}
+                        for comic_chapter in listing_page.data:
+                            if not comic_chapter.id:
+                                continue
+
+                            manga_id = self.__chapter_manga_id(comic_chapter)
+                            if not manga_id:
+                                continue
+
+                            manga_chapters.setdefault(manga_id, []).append(comic_chapter)
+
+                        await asyncio.to_thread(self.__mangas, manga_chapters.keys(), mangas, listing_page.data)
+                        comics.update(await asyncio.to_thread(self.__comics, manga_chapters.keys()))
+                        await asyncio.to_thread(
+                            self.__warm_mal, (mangas[k] for k in manga_chapters if k in mangas), comics
+                        )
+
+                        pages[page] = len(manga_chapters)
+                        complete()
+
+                        for manga_id, comic_chapters in manga_chapters.items():
+                            await queue0.put((page, manga_id, comic_chapters))
+                    case _:
+                        manga_ids: list[str] = []
+                        for manga in listing_page.data:
+                            if manga.id:
+                                mangas[manga.id] = manga
+                                manga_ids.append(manga.id)
+
+                        comics.update(await asyncio.to_thread(self.__comics, manga_ids))
+                        await asyncio.to_thread(self.__warm_mal, (mangas[k] for k in manga_ids), comics)
+
+                        pages[page] = len(manga_ids)
+                        complete()
+
+                        for manga_id in manga_ids:
+                            await queue0.put((page, manga_id, None))
+
+            listing.close()
+
+        async def resolve():
+            nonlocal total_comic, reserved_comic
+
+            while item := await queue0.get():
+                page, manga_id, comic_chapters = item
+
+                if stopped.is_set():
+                    continue
+
+                async with manga_locks[manga_id]:
+                    with self.__audit('manga', manga=manga_id) as record:
+                        record['outcome'] = 'skipped'
+
+                        if manga_id not in mangas:
+                            response1 = await asyncio.to_thread(api1.get_manga_id, manga_id)
+                            if not response1.data:
+                                complete(page)
+                                continue
+
+                            mangas[manga_id] = response1.data
+
+                        # Manga sharing a MAL id resolve to the same comic
+                        if manga_id not in comics:
+                            # A max_comic slot is taken up front and given back if no comic was created
+                            if max_comic:
+                                async with comic_slots:
+                                    await comic_slots.wait_for(
+                                        lambda: total_comic + reserved_comic < max_comic or total_comic > max_comic - 1
+                                    )
+
+                                    if total_comic > max_comic - 1:
+                                        stopped.set()
+                                        continue
+
+                                    reserved_comic += 1
+
+                            async with comic_resolving[self.__resolution_key(mangas[manga_id])]:
+                                comic_code, comic_exist = await asyncio.to_thread(
+                                    self.__manga, mangas[manga_id], comics
+                                )
+
+                            if comic_code and not comic_exist:
+                                total_comic += 1
+
+                            if max_comic:
+                                async with comic_slots:
+                                    reserved_comic -= 1
+                                    comic_slots.notify_all()
+
+                                if total_comic > max_comic - 1:
+                                    stopped.set()
+                        else:
+                            comic_code, comic_exist = await asyncio.to_thread(
+                                self.__manga, mangas[manga_id], comics
+                            )
+
+                        record['comic'] = comic_code
+                        record['outcome'] = self.__outcome(comic_code, comic_exist)
+
+                if not comic_code:
+                    complete(page)
+                    continue
+
+                await queue1.put((page, manga_id, comic_code, comic_chapters))
+
+        async def upsert():
+            while item := await queue1.get():
+                page, manga_id, comic_code, comic_chapters = item
+
+                async with comic_locks[comic_code]:
+                    if comic_chapters is None:
+                        await asyncio.to_thread(self.__manga_feed, manga_id, comic_code, max_comic_chapter)
+                    else:
+                        await asyncio.to_thread(self.__reconcile, manga_id, comic_code, comic_chapters)
+
+                complete(page)
+
+        async with asyncio.TaskGroup() as group:
+            resolvers = [group.create_task(resolve()) for _ in range(workers)]
+            upserters = [group.create_task(upsert()) for _ in range(workers)]
+
+            await discover()
+
+            for _ in resolvers:
+                await queue0.put(None)
+            await asyncio.wait(resolvers)
+
+            for _ in upserters:
+                await queue1.put(None)
+            await asyncio.wait(upserters)
+
+    def scrap_comics_complete_threaded(
+        self,
+        mode: str = 'comic',
+        max_comic: int | None = None,
+        max_comic_chapter: int | None = None,
+        workers: int = 4
+    ):
+        api1 = mangadex_openapi.MangaApi(self.client)
+
+        total_comic = 0
+        reserved_comic = 0
+
+        mangas: dict[str, mangadex_openapi.Manga] = {}
+
+        lock = threading.Lock()
+
+        # Only reserving a max_comic slot is serialised, manga sharing a MAL id are resolved one at a time
+        comic_slots = threading.Condition()
+        comic_resolving: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+        comic_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+
+        def process(
+            manga_id: str,
+            comics: dict[str, list[str]],
+            comic_chapters: list[mangadex_openapi.Chapter] | None
+        ):
+            nonlocal total_comic, reserved_comic
+
+            if max_comic and total_comic > max_comic - 1:
+                return
+
+            with self.__audit('manga', manga=manga_id) as record:
+                record['outcome'] = 'skipped'
+
+                if manga_id not in mangas:
+                    response1 = api1.get_manga_id(manga_id)
+                    if not response1.data:
+                        return
+
+                    mangas[manga_id] = response1.data
+
+                # Manga sharing a MAL id resolve to the same comic
+                if manga_id not in comics:
+                    # A max_comic slot is taken up front and given back if no comic was created
+                    if max_comic:
+                        with comic_slots:
+                            comic_slots.wait_for(
+                                lambda: total_comic + reserved_comic < max_comic or total_comic > max_comic - 1
+                            )
+
+                            if total_comic > max_comic - 1:
+                                return
+
+                            reserved_comic += 1
+
+                    with lock:
+                        resolving = comic_resolving[self.__resolution_key(mangas[manga_id])]
+
+                    comic_code, comic_exist = None, False
+                    try:
+                        with resolving:
+                            comic_code, comic_exist = self.__manga(mangas[manga_id], comics)
+                    finally:
+                        with comic_slots:
+                            if comic_code and not comic_exist:
+                                total_comic += 1
+
+                            if max_comic:
+                                reserved_comic -= 1
+                                comic_slots.notify_all()
+                else:
+                    comic_code, comic_exist = self.__manga(mangas[manga_id], comics)
+
+                record['comic'] = comic_code
+                record['outcome'] = self.__outcome(comic_code, comic_exist)
+
+            if not comic_code:
+                return
+
+            with lock:
+                comic_lock = comic_locks[comic_code]
+
+            with comic_lock:
+                if comic_chapters is None:
+                    self.__manga_feed(manga_id, comic_code, max_comic_chapter)
+                    return
+
+                self.__reconcile(manga_id, comic_code, comic_chapters)
+
+        offset, since, _ = self.__checkpoint_resume(mode)
+
+        with ThreadPoolExecutor(workers) as executor:
+            for page in self.__listing(mode, offset, since):
+                if max_comic and total_comic > max_comic - 1:
+                    break
+
+                manga_chapters: dict[str, list[mangadex_openapi.Chapter] | None] = {}
+
+                match mode:
+                    case 'comic-chapter':
+                        for comic_chapter in page.data:
+                            if not comic_chapter.id:
+                                continue
+
+                            manga_id = self.__chapter_manga_id(comic_chapter)
+                            if not manga_id:
+                                continue
+
+                            manga_chapters.setdefault(manga_id, []).append(comic_chapter) # type: ignore[union-attr]
+
+                        self.__mangas(manga_chapters.keys(), mangas, page.data)
+                    case _:
+                        for manga in page.data:
+                            if manga.id:
+                                mangas[manga.id] = manga
+                                manga_chapters[manga.id] = None
+
+                comics = self.__comics(manga_chapters.keys())
+                self.__warm_mal((mangas[k] for k in manga_chapters if k in mangas), comics)
+
+                futures = [
+                    executor.submit(process, manga_id, comics, comic_chapters)
+                    for manga_id, comic_chapters in manga_chapters.items()
+                ]
+                for future in wait(futures).done:
+                    future.result()
+
+                # A page cut short by max_comic is done again on the next run
+                if not max_comic or total_comic < max_comic:
+                    self.__checkpoint_page(mode, page)
+
+    def __plan_comic(self, plan: Plan, comic_code: str, manga: mangadex_openapi.Manga):
+        api0 = comicbagi_openapi.ComicApi(self.bot.client)
+
+        manga_attributes = manga.attributes
+        if not manga.id or not manga_attributes or not manga_attributes.available_translated_languages:
+            return
+
+        comic_link = f'{self.website_mangadex_host}/title/{manga.id}'
+
+        comic_provider_languages: list[str] = []
+        for manga_language in manga_attributes.available_translated_languages:
+            if manga_language not in self.bot.languages:
+                continue
+
+            if self.bot.cached(Cache.kind_comic_provider, f'{comic_code} {comic_link} {manga_language}'):
+                continue
+
+            comic_provider_languages.append(manga_language)
+
+        if not comic_provider_languages:
+            return
+
+        # The comic was found through this link, only its provider languages can be missing
+        response0 = api0.list_comic_provider(comic_code, link_href=[quote(comic_link)])
+
+        for comic_provider in response0:
+            if comic_provider.language_lang:
+                self.bot.cache_add(
+                    Cache.kind_comic_provider,
+                    f'{comic_code} {comic_link} {comic_provider.language_lang}'
+                )
+
+        comic_released_at = datetime.now()
+        if manga_attributes.created_at:
+            comic_released_at = datetime.fromisoformat(manga_attributes.created_at)
+
+        for manga_language in comic_provider_languages:
+            if any(manga_language == comic_provider.language_lang for comic_provider in response0):
+                continue
+
+            plan.add_comic_provider(
+                comic_code,
+                self.website_mangadex_host,
+                f'/title/{manga.id}',
+                manga_language,
+                comic_released_at
+            )
+
+    def __chapter_diff(self, comic_code: str, chapters: Iterable[mangadex_openapi.Chapter]):
+        api0 = comicbagi_openapi.ComicChapterApi(self.bot.client)
+        api1 = comicbagi_openapi.LinkApi(self.bot.client)
+
+        candidates: list[tuple[mangadex_openapi.Chapter, int | float, str]] = []
+        for chapter in chapters:
+            chapter_attributes = chapter.attributes
+
+            if not chapter.id or not chapter_attributes or not chapter_attributes.chapter:
+                continue
+
+            chapter_language = chapter_attributes.translated_language
+            if not chapter_language or chapter_language not in self.bot.languages:
+                continue
+
+            chapter_number = float(chapter_attributes.chapter)
+            try:
+                chapter_number = int(chapter_attributes.chapter)
+            except ValueError:
+                pass
+
+            candidates.append((chapter, chapter_number, chapter_language))
+
+        if not candidates:
+            return []
+
+        # Chapter
+
+        for _, chapter_number, _ in candidates:
+            if self.bot.cached(Cache.kind_comic_chapter, f'{comic_code} {chapter_number}'):
+                self.bot.comic_chapters.put(comic_code, chapter_number)
+
+        # Chapters added since are put in the registry by whoever added them, list once per comic
+        if comic_code not in self.chapters_listed and any(
+            not self.bot.comic_chapters.has(comic_code, n) for _, n, _ in candidates
+        ):
+            for comic_chapter in self.bot.list_complete(
+                api0.list_comic_chapter_with_http_info,
+                comic_code,
+                limit=100
+            ):
+                if comic_chapter.version:
+                    continue
+
+                comic_chapter_number = comic_chapter.number
+                if isinstance(comic_chapter_number, float) and comic_chapter_number.is_integer():
+                    comic_chapter_number = int(comic_chapter_number)
+
+                self.bot.comic_chapters.put(comic_code, comic_chapter_number)
+                self.bot.cache_add(Cache.kind_comic_chapter, f'{comic_code} {comic_chapter_number}')
+
+            self.chapters_listed.add(comic_code)
+
+        # Chapter Link
+
+        chapter_hrefs = [
+            f'{self.website_mangadex_host}/chapter/{chapter.id}' for chapter, _, _ in candidates
+        ]
+
+        chapter_links = set(
+            href for href in chapter_hrefs
+            if href in self.bot.links or self.bot.cached(Cache.kind_link, href)
+        )
+
+        unknown_hrefs = [
+            href for href in chapter_hrefs
+            if href not in chapter_links and not self.bot.links.covers(href)
+        ]
+        for i in range(0, len(unknown_hrefs), 100):
+            for link in self.bot.list_complete(
+                api1.list_link_with_http_info,
+                limit=100,
+                href=[quote(href) for href in unknown_hrefs[i:i+100]],
+                unredact=[self.website_mangadex_host]
+            ):
+                href = f'{link.website_host}{link.relative_reference or ""}'
+
+                chapter_links.add(href)
+                self.bot.cache_add(Cache.kind_link, href)
+
+        # Chapter Provider
+
+        chapter_providers: set[tuple[str, str]] = set()
+
+        # A provider cannot exist without its chapter and link, only those need a provider read
+        unknown_providers: dict[str, dict[int | float, list[str]]] = {}
+        for chapter, chapter_number, chapter_language in candidates:
+            chapter_href = f'{self.website_mangadex_host}/chapter/{chapter.id}'
+
+            if chapter_href not in chapter_links or not self.bot.comic_chapters.has(comic_code, chapter_number):
+                continue
+
+            if self.bot.cached(
+                Cache.kind_comic_chapter_provider,
+                f'{comic_code} {chapter_number} {chapter_href} {chapter_language}'
+            ):
+                chapter_providers.add((chapter_href, chapter_language))
+                continue
+
+            unknown_providers.setdefault(chapter_language, {}).setdefault(chapter_number, []).append(chapter_href)
+
+        # Chapters listed by provider link only tell the number, which maps back unless several links share it
+        for chapter_language, chapter_numbers in unknown_providers.items():
+            hrefs = [href for numbers in chapter_numbers.values() for href in numbers]
+
+            for i in range(0, len(hrefs), 100):
+                batch = set(hrefs[i:i+100])
+
+                for comic_chapter in self.bot.list_complete(
+                    api0.list_comic_chapter_with_http_info,
+                    comic_code,
+                    limit=100,
+                    provider_link_href=[quote(href) for href in batch],
+                    provider_language_lang=[chapter_language]
+                ):
+                    if comic_chapter.version:
+                        continue
+
+                    comic_chapter_number = comic_chapter.number
+                    if isinstance(comic_chapter_number, float) and comic_chapter_number.is_integer():
+                        comic_chapter_number = int(comic_chapter_number)
+
+                    matches = [href for href in chapter_numbers.get(comic_chapter_number, []) if href in batch]
+                    if len(matches) > 1:
+                        matches = [
+                            f'{p.link_website_host}{p.link_relative_reference or ""}'
+                            for p in api0.list_comic_chapter_provider(
+                                comic_code,
+                                str(comic_chapter_number),
+                                link_href=[quote(quote(href)) for href in matches],
+                                language_lang=[chapter_language],
+                                unredact=[self.website_mangadex_host]
+                            )
+                        ]
+
+                    for href in matches:
+                        chapter_providers.add((href, chapter_language))
+
+                        self.bot.cache_add(
+                            Cache.kind_comic_chapter_provider,
+                            f'{comic_code} {comic_chapter_number} {href} {chapter_language}'
+                        )
+
+        return [
+            (
+                chapter,
+                chapter_number,
+                chapter_language,
+                self.bot.comic_chapters.has(comic_code, chapter_number),
+                f'{self.website_mangadex_host}/chapter/{chapter.id}' in chapter_links,
+                (f'{self.website_mangadex_host}/chapter/{chapter.id}', chapter_language) in chapter_providers
+            )
+            for chapter, chapter_number, chapter_language in candidates
+        ]
+
+    def __reconcile(self, manga_id: str, comic_code: str, chapters: list[mangadex_openapi.Chapter]):
+        outcomes = dict.fromkeys((chapter.id for chapter in chapters if chapter.id), 'skipped')
+
+        for (
+            chapter,
+            chapter_number,
+            chapter_language,
+            chapter_exist,
+            link_exist,
+            provider_exist
+        ) in self.__chapter_diff(comic_code, chapters):
+            chapter_nv = str(chapter_number)
+
+            # Several MangaDex chapters may share the number, the registry may also have evicted a listed one
+            if not chapter_exist and not self.bot.comic_chapters.has(comic_code, chapter_number):
+                if not self.__write(self.bot.add_comic_chapter, comic_code, chapter_number, None):
+                    self.bot.comic_chapters.put(comic_code, chapter_number)
+
+                    chapter_exist = True
+
+            chapter_href = f'{self.website_mangadex_host}/chapter/{chapter.id}'
+            if not link_exist and chapter_href not in self.bot.links:
+                if not self.__write(self.bot.add_link, self.website_mangadex_host, f'/chapter/{chapter.id}'):
+                    self.bot.links.add(chapter_href)
+
+            if not provider_exist:
+                chapter_released_at = datetime.now()
+                if chapter.attributes and chapter.attributes.created_at:
+                    chapter_released_at = datetime.fromisoformat(chapter.attributes.created_at)
+
+                self.__write(
+                    self.bot.add_comic_chapter_provider,
+                    comic_code,
+                    chapter_nv,
+                    self.website_mangadex_host,
+                    f'/chapter/{chapter.id}',
+                    chapter_language,
+                    chapter_released_at
+                )
+
+            outcomes[chapter.id] = self.__outcome(chapter_nv, chapter_exist)
+
+        for chapter_id, outcome in outcomes.items():
+            self.bot.audit('chapter', manga=manga_id, chapter=chapter_id, comic=comic_code, outcome=outcome)
+
+        return outcomes
+
+    def __plan_chapters(self, plan: Plan, comic_code: str, chapters: list[mangadex_openapi.Chapter]):
+        for (
+            chapter,
+            chapter_number,
+            chapter_language,
+            chapter_exist,
+            link_exist,
+            provider_exist
+        ) in self.__chapter_diff(comic_code, chapters):
+            if not chapter_exist:
+                plan.add_comic_chapter(comic_code, chapter_number)
+
+            if not link_exist:
+                plan.add_link(self.website_mangadex_host, f'/chapter/{chapter.id}')
+
+            if provider_exist:
+                continue
+
+            chapter_released_at = datetime.now()
+            if chapter.attributes and chapter.attributes.created_at:
+                chapter_released_at = datetime.fromisoformat(chapter.attributes.created_at)
+
+            plan.add_comic_chapter_provider(
+                comic_code,
+                str(chapter_number),
+                self.website_mangadex_host,
+                f'/chapter/{chapter.id}',
+                chapter_language,
+                chapter_released_at
+            )
+
+    def __plan_rejected(self, manga: mangadex_openapi.Manga, comics: dict[str, list[str]]):
+        manga_attributes = manga.attributes
+
+        if not manga.id or self.__rejected(manga, Cache.kind_manga_unsupported):
+            return True
+
+        if not manga_attributes or not manga_attributes.available_translated_languages:
+            self.__reject(manga, Cache.kind_manga_unsupported)
+            return True
+
+        if not any(l in self.bot.languages for l in manga_attributes.available_translated_languages):
+            self.__reject(manga, Cache.kind_manga_unsupported)
+            return True
+
+        if manga.id in comics:
+            return False
+
+        if self.__rejected(manga, Cache.kind_manga_unresolved):
+            return True
+
+        mal_id = (manga_attributes.links or {}).get('mal')
+        if not mal_id or not self.comicking_jikan_bot:
+            self.note('No information provider supported.')
+
+            if self.comicking_jikan_bot:
+                self.__reject(manga, Cache.kind_manga_unresolved)
+
+            return True
+
+        return False
+
+    def __plan_manga(
+        self,
+        plan: Plan,
+        manga: mangadex_openapi.Manga,
+        comics: dict[str, list[str]],
+        chapters: list[mangadex_openapi.Chapter]
+    ):
+        if manga.id in comics:
+            if len(comics[manga.id]) > 1:
+                self.note('Detected multiple comic with same MangaDex ID %s' % manga.id)
+
+            comic_code = comics[manga.id][0]
+
+            self.__plan_comic(plan, comic_code, manga)
+            self.__plan_chapters(plan, comic_code, chapters)
+
+            return False
+
+        if manga.id not in plan.comics:
+            plan.add_comic(manga, int((manga.attributes.links or {})['mal']), chapters)
+            return True
+
+        plan.chapters[manga.id].extend(chapters)
+        return False
+
+    def __write(self, __add: Callable[..., Any], *args: Any):
+        try:
+            __add(*args)
+        except comicbagi_openapi.ApiException as e:
+            # Written by someone else in the meantime, or known to exist but no longer remembered
+            if e.status != 409:
+                raise e
+
+            return False
+
+        return True
+
+    def scrap_comics_plan(
+        self,
+        mode: str = 'comic',
+        max_comic: int | None = None,
+        max_comic_chapter: int | None = None,
+        dry_run: bool = False,
+        plan_path: str | None = None
+    ):
+        self.bot.authenticate()
+
+        plan = Plan()
+
+        total_comic = 0
+
+        mangas: dict[str, mangadex_openapi.Manga] = {}
+
+        #
+        # Read
+        #
+
+        for page in self.__listing(mode):
+            if max_comic and total_comic > max_comic - 1:
+                break
+
+            manga_chapters: dict[str, list[mangadex_openapi.Chapter]] = {}
+
+            match mode:
+                case 'comic-chapter':
+                    for comic_chapter in page.data:
+                        manga_id = self.__chapter_manga_id(comic_chapter)
+                        if comic_chapter.id and manga_id:
+                            manga_chapters.setdefault(manga_id, []).append(comic_chapter)
+
+                    self.__mangas(manga_chapters.keys(), mangas, page.data)
+                case _:
+                    for manga in page.data:
+                        if manga.id:
+                            mangas[manga.id] = manga
+                            manga_chapters[manga.id] = []
+
+            comics = self.__comics(manga_chapters.keys())
+            self.__warm_mal((mangas[k] for k in manga_chapters if k in mangas), comics)
+
+            for manga_id, comic_chapters in manga_chapters.items():
+                if max_comic and total_comic > max_comic - 1:
+                    break
+
+                if manga_id not in mangas:
+                    continue
+
+                with self.__audit('plan', manga=manga_id) as record:
+                    record['outcome'] = 'checked'
+
+                    # Turned away manga never have their feed read
+                    if self.__plan_rejected(mangas[manga_id], comics):
+                        continue
+
+                    if mode != 'comic-chapter':
+                        comic_chapters = self.__manga_chapters(manga_id, max_comic_chapter)
+
+                    if self.__plan_manga(plan, mangas[manga_id], comics, comic_chapters):
+                        record['outcome'] = 'added'
+
+                        total_comic += 1
+
+        self.note('Plan %s' % ', '.join(f'{k} {v}' for k, v in plan.summary().items()))
+
+        if plan_path:
+            plan.dump(plan_path)
+
+        if dry_run:
+            return plan
+
+        #
+        # Write
+        #
+
+        # New comics go through ComicKing first, their code is only known after that
+        self.__warm_mal(plan.mangas.values(), {})
+
+        for manga_id in plan.comics:
+            comic_code, _ = self.__manga(plan.mangas[manga_id], {})
+            if not comic_code:
+                continue
+
+            for comic_chapter in plan.chapters[manga_id]:
+                self.__manga_chapter(comic_code, comic_chapter)
+
+        for website_host, relative_reference in plan.links.values():
+            self.__write(self.bot.add_link, website_host, relative_reference)
+
+        for v in plan.comic_providers.values():
+            self.__write(
+                self.bot.add_comic_provider,
+                v['comic'],
+                v['link_website_host'],
+                v['link_relative_reference'],
+                v['language'],
+                v['released_at']
+            )
+
+        for v in plan.comic_chapters.values():
+            self.__write(self.bot.add_comic_chapter, v['comic'], v['number'], None)
+
+        for v in plan.comic_chapter_providers.values():
+            self.__write(
+                self.bot.add_comic_chapter_provider,
+                v['comic'],
+                v['chapter'],
+                v['link_website_host'],
+                v['link_relative_reference'],
+                v['language'],
+                v['released_at']
+            )
+
+        return plan
+
+    def __manga_chapters(self, manga_id: str, max_comic_chapter: int | None = None):
+        api0 = mangadex_openapi.MangaApi(self.client)
+
+        chapters: list[mangadex_openapi.Chapter] = []
+
+        for page in Paginator(
+            api0.get_manga_id_feed,
+            manga_id,
+            limit=30,
+            translated_language=self.__languages(),
+            include_future_updates='0',
+            include_empty_pages=0,
+            order=self.__feed_order()
+        ).pages():
+            chapters.extend(chapter for chapter in page.data if chapter.id)
+
+            if max_comic_chapter and len(chapters) >= max_comic_chapter:
+                break
 
-            page += 1
-            time.sleep(3)
+        return chapters[:max_comic_chapter] if max_comic_chapter else chapters
@@ -0,0 +1,112 @@
+import time
+import sqlite3
+import threading
+from typing import Iterable
+
+class Cache:
+    kind_website = 'website'
+    kind_link = 'link'
+    kind_comic = 'comic'
+    kind_comic_provider = 'comic-provider'
+    kind_comic_chapter = 'comic-chapter'
+    kind_comic_chapter_provider = 'comic-chapter-provider'
+    kind_manga_unsupported = 'manga-unsupported'
+    kind_manga_unresolved = 'manga-unresolved'
+    kind_mal_comic = 'mal-comic'
+    kind_manga_comic = 'manga-comic'
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = 604800
+    ):
+        self.ttl = ttl
+
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS cache ('
+            'kind TEXT NOT NULL, '
+            'key TEXT NOT NULL, '
+            'expires REAL NOT NULL, '
+            'value TEXT, '
+            'PRIMARY KEY (kind, key)'
+            ') WITHOUT ROWID'
+        )
+
+        # Files written before values were kept lack the column
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(cache)')]
+        if 'value' not in columns:
+            self.connection.execute('ALTER TABLE cache ADD COLUMN value TEXT')
+
+        self.connection.execute('DELETE FROM cache WHERE expires <= ?', (time.time(),))
+
+    def has(self, kind: str, key: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT 1 FROM cache WHERE kind = ? AND key = ? AND expires > ?',
+                (kind, key, time.time())
+            ).fetchone()
+
+        return row is not None
+
+    def get(self, kind: str, key: str) -> str | None:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT value FROM cache WHERE kind = ? AND key = ? AND expires > ?',
+                (kind, key, time.time())
+            ).fetchone()
+
+        return row[0] if row else None
+
+    def get_many(self, kind: str, keys: Iterable[str]) -> dict[str, str]:
+        keys = list(dict.fromkeys(keys))
+
+        values: dict[str, str] = {}
+
+        # Stay under the SQLite bound parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i+500]
+
+            with self.lock:
+                rows = self.connection.execute(
+                    'SELECT key, value FROM cache WHERE kind = ? AND expires > ? '
+                    f'AND key IN ({", ".join("?" * len(chunk))})',
+                    (kind, time.time(), *chunk)
+                ).fetchall()
+
+            for key, value in rows:
+                if value is not None:
+                    values[key] = value
+
+        return values
+
+    def add(self, kind: str, key: str, ttl: float | None = None, value: str | None = None):
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO cache (kind, key, expires, value) VALUES (?, ?, ?, ?)',
+                (kind, key, time.time() + (self.ttl if ttl is None else ttl), value)
+            )
+
+    def delete(self, kind: str, key: str):
+        with self.lock:
+            self.connection.execute(
+                'DELETE FROM cache WHERE kind = ? AND key = ?',
+                (kind, key)
+            )
+
+    def clear(self, kind: str | None = None) -> int:
+        with self.lock:
+            if kind:
+                cursor = self.connection.execute('DELETE FROM cache WHERE kind = ?', (kind,))
+            else:
+                cursor = self.connection.execute('DELETE FROM cache')
+
+        return cursor.rowcount
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,63 @@
+import os
+import json
+import threading
+from typing import Any
+
+class Checkpoint:
+    def __init__(self, path: str):
+        self.path = path
+
+        self.lock = threading.Lock()
+
+        self.data: dict[str, dict[str, Any]] = {}
+
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.data = json.load(f)
+
+    def get(self, mode: str) -> dict[str, Any]:
+        with self.lock:
+            return json.loads(json.dumps(self.data.get(mode, {})))
+
+    def update(self, mode: str, **values: Any):
+        with self.lock:
+            self.data.setdefault(mode, {}).update(values)
+            self.__save()
+
+    def feed(self, mode: str, manga_id: str, offset: int | None = None, order: str | None = None):
+        with self.lock:
+            data = self.data.setdefault(mode, {})
+
+            # Offsets saved under another feed order or filter point somewhere else
+            if data.get('feeds_order') != order:
+                data['feeds'] = {}
+                data['feeds_order'] = order
+
+            feeds: dict[str, int] = data.setdefault('feeds', {})
+
+            if offset is None:
+                if manga_id not in feeds:
+                    return
+                del feeds[manga_id]
+            else:
+                feeds[manga_id] = offset
+
+            self.__save()
+
+    def reset(self, mode: str | None = None):
+        with self.lock:
+            if mode:
+                self.data.pop(mode, None)
+            else:
+                self.data.clear()
+
+            self.__save()
+
+    def __save(self):
+        # Write aside and swap so a crash never leaves a torn checkpoint
+        with open(f'{self.path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(self.data, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(f'{self.path}.tmp', self.path)
@@ -0,0 +1,153 @@
+import json
+from typing import Any, Callable
+
+class Relationship:
+    __slots__ = ('id', 'type', 'attributes')
+
+    def __init__(self, data: dict[str, Any]):
+        self.id: str | None = data.get('id')
+        self.type: str | None = data.get('type')
+
+        # Kept raw like the generated model does, only set with includes[]
+        self.attributes: dict[str, Any] | None = data.get('attributes')
+
+class MangaAttributes:
+    __slots__ = ('available_translated_languages', 'links', 'created_at', 'updated_at')
+
+    def __init__(self, data: dict[str, Any]):
+        self.available_translated_languages: list[str] | None = data.get('availableTranslatedLanguages')
+        self.links: dict[str, str] | None = data.get('links')
+        self.created_at: str | None = data.get('createdAt')
+        self.updated_at: str | None = data.get('updatedAt')
+
+class Manga:
+    __slots__ = ('id', 'type', 'attributes', 'relationships')
+
+    def __init__(self, data: dict[str, Any]):
+        self.id: str | None = data.get('id')
+        self.type: str | None = data.get('type')
+        self.attributes = MangaAttributes(data['attributes']) if data.get('attributes') else None
+        self.relationships = [Relationship(v) for v in data.get('relationships') or []]
+
+class ChapterAttributes:
+    __slots__ = ('chapter', 'translated_language', 'created_at', 'updated_at')
+
+    def __init__(self, data: dict[str, Any]):
+        self.chapter: str | None = data.get('chapter')
+        self.translated_language: str | None = data.get('translatedLanguage')
+        self.created_at: str | None = data.get('createdAt')
+        self.updated_at: str | None = data.get('updatedAt')
+
+class Chapter:
+    __slots__ = ('id', 'type', 'attributes', 'relationships')
+
+    def __init__(self, data: dict[str, Any]):
+        self.id: str | None = data.get('id')
+        self.type: str | None = data.get('type')
+        self.attributes = ChapterAttributes(data['attributes']) if data.get('attributes') else None
+        self.relationships = [Relationship(v) for v in data.get('relationships') or []]
+
+class Entity:
+    __slots__ = ('data',)
+
+    def __init__(self, data: dict[str, Any], entity: Callable[[dict[str, Any]], Any]):
+        self.data = entity(data['data']) if data.get('data') else None
+
+class EntityList:
+    __slots__ = ('data', 'limit', 'offset', 'total')
+
+    def __init__(self, data: dict[str, Any], entity: Callable[[dict[str, Any]], Any]):
+        self.data = [entity(v) for v in data.get('data') or []]
+        self.limit: int | None = data.get('limit')
+        self.offset: int | None = data.get('offset')
+        self.total: int | None = data.get('total')
+
+class Language:
+    __slots__ = ('lang', 'name')
+
+    def __init__(self, data: dict[str, Any]):
+        self.lang: str = data['lang']
+        self.name: str | None = data.get('name')
+
+class Link:
+    __slots__ = ('website_host', 'website_redacted', 'relative_reference')
+
+    def __init__(self, data: dict[str, Any]):
+        self.website_host: str = data['websiteHost']
+        self.website_redacted: bool | None = data.get('websiteRedacted')
+        self.relative_reference: str | None = data.get('relativeReference')
+
+class Comic:
+    __slots__ = ('code',)
+
+    def __init__(self, data: dict[str, Any]):
+        self.code: str = data['code']
+
+class ComicChapter:
+    __slots__ = ('number', 'version')
+
+    def __init__(self, data: dict[str, Any]):
+        self.number: int | float = data['number']
+        self.version: str | None = data.get('version')
+
+class Provider:
+    __slots__ = ('link_website_host', 'link_relative_reference', 'language_lang')
+
+    def __init__(self, data: dict[str, Any]):
+        self.link_website_host: str = data['linkWebsiteHost']
+        self.link_relative_reference: str | None = data.get('linkRelativeReference')
+        self.language_lang: str | None = data.get('languageLang')
+
+class Response:
+    __slots__ = ('status_code', 'data', 'headers', 'raw_data')
+
+    def __init__(self, status_code: int, data: Any, headers: Any, raw_data: bytes):
+        self.status_code = status_code
+        self.data = data
+        self.headers = headers
+        self.raw_data = raw_data
+
+class Decoder:
+    def __init__(self, fast_parser: bool = True):
+        self.loads: Callable[[bytes], Any] = json.loads
+        if fast_parser:
+            try:
+                import orjson
+
+                self.loads = orjson.loads
+            except ImportError:
+                pass
+
+        # Response types as the generated clients name them, anything else takes the model path
+        self.types: dict[str, Callable[[Any], Any]] = {
+            'MangaList': lambda v: EntityList(v, Manga),
+            'MangaResponse': lambda v: Entity(v, Manga),
+            'ChapterList': lambda v: EntityList(v, Chapter),
+            'ChapterResponse': lambda v: Entity(v, Chapter),
+            'List[Language]': lambda v: [Language(x) for x in v],
+            'List[Link]': lambda v: [Link(x) for x in v],
+            'List[Comic]': lambda v: [Comic(x) for x in v],
+            'List[ComicProvider]': lambda v: [Provider(x) for x in v],
+            'List[ComicChapter]': lambda v: [ComicChapter(x) for x in v],
+            'List[ComicChapterProvider]': lambda v: [Provider(x) for x in v]
+        }
+
+    def manga(self, data: dict[str, Any]):
+        return Manga(data)
+
+    def install(self, client: Any):
+        response_deserialize = client.response_deserialize
+
+        def decoded_response_deserialize(response_data: Any, response_types_map: dict[str, Any] | None = None):
+            decode = self.types.get((response_types_map or {}).get(str(response_data.status)) or '')
+            if not decode or not response_data.data:
+                return response_deserialize(response_data=response_data, response_types_map=response_types_map)
+
+            return Response(
+                response_data.status,
+                decode(self.loads(response_data.data)),
+                response_data.getheaders(),
+                response_data.data
+            )
+
+        client.response_deserialize = decoded_response_deserialize
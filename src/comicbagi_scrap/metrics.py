@@ -0,0 +1,203 @@
+import os
+import json
+import time
+import bisect
+import threading
+from collections import Counter
+from typing import Any
+from urllib.parse import urlparse
+
+from .ratelimit import RateLimiter
+
+class Series:
+    def __init__(self, buckets: int):
+        self.count = 0
+        self.sum = 0.0
+        self.buckets = [0] * buckets
+        self.statuses: Counter[str] = Counter()
+
+class Metrics:
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(
+        self,
+        path: str | None = None,
+        interval: float = 60,
+        rate_limiter: RateLimiter | None = None
+    ):
+        self.path = path
+        self.interval = interval
+        self.rate_limiter = rate_limiter
+
+        self.series: dict[tuple[str, str], Series] = {}
+
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+    def observe(self, host: str, operation: str, seconds: float, status: int | str):
+        with self.lock:
+            series = self.series.get((host, operation))
+            if not series:
+                series = self.series[(host, operation)] = Series(len(self.buckets) + 1)
+
+            series.count += 1
+            series.sum += seconds
+            series.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+            series.statuses[str(status)] += 1
+
+    def install(self, client: Any):
+        host = urlparse(client.configuration.host).netloc
+
+        param_serialize = client.param_serialize
+        call_api = client.call_api
+
+        # Generated methods serialize then call on the same thread, carry the path template across
+        def named_param_serialize(*args: Any, **kwargs: Any):
+            method = kwargs.get('method') or args[0]
+            resource_path = kwargs.get('resource_path') or args[1]
+
+            self.local.operation = f'{method} {resource_path}'
+
+            return param_serialize(*args, **kwargs)
+
+        def measured_call_api(method: str, url: str, *args: Any, **kwargs: Any):
+            operation = getattr(self.local, 'operation', None) or f'{method} {urlparse(url).path}'
+
+            status: int | str = 'error'
+
+            start = time.perf_counter()
+            try:
+                response = call_api(method, url, *args, **kwargs)
+                status = response.status
+
+                return response
+            finally:
+                self.observe(host, operation, time.perf_counter() - start, status)
+
+        client.param_serialize = named_param_serialize
+        client.call_api = measured_call_api
+
+    def instrument(self, target: Any, prefix: str = 'add_'):
+        host = urlparse(target.client.configuration.host).netloc
+
+        def measure(method: Any, operation: str):
+            def measured_method(*args: Any, **kwargs: Any):
+                status = 'error'
+
+                start = time.perf_counter()
+                try:
+                    result = method(*args, **kwargs)
+                    status = 'ok'
+
+                    return result
+                finally:
+                    self.observe(host, operation, time.perf_counter() - start, status)
+
+            return measured_method
+
+        for name in dir(target):
+            if not name.startswith(prefix) or not callable(getattr(target, name)):
+                continue
+
+            setattr(target, name, measure(getattr(target, name), f'{type(target).__name__}.{name}'))
+
+    def start(self):
+        if not self.path or self.thread:
+            return
+
+        def run():
+            while not self.stopped.wait(self.interval):
+                self.export()
+
+        self.thread = threading.Thread(target=run, name='metrics', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+        self.export()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            operations = [{
+                'host': host,
+                'operation': operation,
+                'count': series.count,
+                'sum': series.sum,
+                'buckets': dict(zip([*map(str, self.buckets), '+Inf'], series.buckets)),
+                'statuses': dict(series.statuses)
+            } for (host, operation), series in sorted(self.series.items())]
+
+        rate_limit_sleep: dict[str, float] = {}
+        if self.rate_limiter:
+            with self.rate_limiter.lock:
+                rate_limit_sleep = {k: v.slept for k, v in self.rate_limiter.limits.items()}
+
+        return {
+            'time': time.time(),
+            'operations': operations,
+            'rate_limit_sleep': rate_limit_sleep
+        }
+
+    def prometheus(self, snapshot: dict[str, Any] | None = None):
+        snapshot = snapshot or self.snapshot()
+
+        def labels(**values: Any):
+            return ','.join(
+                '%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                for k, v in values.items()
+            )
+
+        lines = [
+            '# HELP comicbagi_scrap_requests_total Calls made, by outcome.',
+            '# TYPE comicbagi_scrap_requests_total counter'
+        ]
+        for operation in snapshot['operations']:
+            for status, count in sorted(operation['statuses'].items()):
+                lines.append('comicbagi_scrap_requests_total{%s} %d' % (
+                    labels(host=operation['host'], operation=operation['operation'], status=status), count
+                ))
+
+        lines.append('# HELP comicbagi_scrap_request_duration_seconds Call latency.')
+        lines.append('# TYPE comicbagi_scrap_request_duration_seconds histogram')
+        for operation in snapshot['operations']:
+            cumulative = 0
+            for le, count in operation['buckets'].items():
+                cumulative += count
+                lines.append('comicbagi_scrap_request_duration_seconds_bucket{%s} %d' % (
+                    labels(host=operation['host'], operation=operation['operation'], le=le), cumulative
+                ))
+
+            series = labels(host=operation['host'], operation=operation['operation'])
+            lines.append('comicbagi_scrap_request_duration_seconds_sum{%s} %f' % (series, operation['sum']))
+            lines.append('comicbagi_scrap_request_duration_seconds_count{%s} %d' % (series, operation['count']))
+
+        lines.append('# HELP comicbagi_scrap_rate_limit_sleep_seconds_total Time spent waiting on the rate limiter.')
+        lines.append('# TYPE comicbagi_scrap_rate_limit_sleep_seconds_total counter')
+        for host, slept in sorted(snapshot['rate_limit_sleep'].items()):
+            lines.append('comicbagi_scrap_rate_limit_sleep_seconds_total{%s} %f' % (labels(host=host), slept))
+
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str | None = None):
+        path = path or self.path
+        if not path:
+            return
+
+        snapshot = self.snapshot()
+
+        # Write aside and swap so scrapers never read a half written file
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            if path.endswith('.json'):
+                json.dump(snapshot, f)
+            else:
+                f.write(self.prometheus(snapshot))
+
+        os.replace(f'{path}.tmp', path)
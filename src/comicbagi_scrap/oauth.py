@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any
+
+from .transport import Transport
+
+class TokenManager:
+    def __init__(
+        self,
+        transport: Transport,
+        issuer: str,
+        client_id: str,
+        client_secret: str,
+        audience: str,
+        logger: logging.Logger,
+        cache_path: str | None = None,
+        margin: float = 300
+    ):
+        self.transport = transport
+
+        self.issuer = issuer
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.audience = audience
+
+        self.logger = logger
+
+        self.cache_path = cache_path
+
+        # Tokens are replaced this long before they expire
+        self.margin = margin
+
+        self.access_token: str | None = None
+        self.expires = 0.0
+
+        self.lock = threading.RLock()
+
+        self.stopped = threading.Event()
+        self.thread: threading.Thread | None = None
+
+        self.__load()
+
+    def valid(self, margin: float | None = None):
+        return bool(self.access_token) and self.expires > time.time() + (self.margin if margin is None else margin)
+
+    def token(self) -> str:
+        # A running refresher replaces the token in time, only block once it is really about to expire
+        if self.valid(30 if self.thread else None):
+            return self.access_token # type: ignore[return-value]
+
+        with self.lock:
+            if not self.valid():
+                self.__refresh()
+
+            return self.access_token # type: ignore[return-value]
+
+    def refresh(self, rejected: str | None = None) -> str:
+        with self.lock:
+            # Another request may already have replaced the token that was turned down
+            if rejected and rejected == self.access_token:
+                self.__refresh(rejected)
+            elif not self.valid(0):
+                self.__refresh()
+
+            return self.access_token # type: ignore[return-value]
+
+    def __refresh(self, rejected: str | None = None):
+        # Another process may have refreshed it in the meantime
+        if self.__load() and self.access_token != rejected:
+            return
+
+        response = self.transport.request(
+            'POST',
+            f'{self.issuer}oauth/token',
+            fields={
+                'grant_type': 'client_credentials',
+                'client_id': self.client_id,
+                'client_secret': self.client_secret,
+                'audience': self.audience
+            },
+            encode_multipart=False
+        )
+
+        if response.status >= 400:
+            raise RuntimeError('Bot authentication failed')
+
+        token = json.loads(response.data)
+
+        self.access_token = token['access_token']
+        self.expires = time.time() + float(token['expires_in'])
+
+        self.__save()
+
+        self.logger.info('OAuth token refreshed, expires in %ds', int(self.expires - time.time()))
+
+    def __key(self):
+        return [self.issuer, self.client_id, self.audience]
+
+    def __load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return False
+
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+
+        if data.get('key') != self.__key() or data.get('expires', 0) <= self.expires:
+            return self.valid()
+
+        self.access_token = data['access_token']
+        self.expires = data['expires']
+
+        return self.valid()
+
+    def __save(self):
+        if not self.cache_path:
+            return
+
+        # Readable by the owner only, write aside and swap
+        fd = os.open(f'{self.cache_path}.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({'key': self.__key(), 'access_token': self.access_token, 'expires': self.expires}, f)
+
+        os.replace(f'{self.cache_path}.tmp', self.cache_path)
+
+    def start(self):
+        if self.thread:
+            return
+
+        def run():
+            delay = 0.0
+            while not self.stopped.wait(delay):
+                try:
+                    with self.lock:
+                        if not self.valid():
+                            self.__refresh()
+
+                    delay = max(1.0, self.expires - self.margin - time.time())
+                except Exception as e:
+                    self.logger.warning('OAuth token refresh failed: %s', e)
+
+                    delay = 30.0
+
+        self.thread = threading.Thread(target=run, name='oauth', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+
+    def install(self, client: Any):
+        param_serialize = client.param_serialize
+        call_api = client.call_api
+
+        # Serialization reads the token from the configuration, hand it the current one
+        def authorized_param_serialize(*args: Any, **kwargs: Any):
+            if self.access_token:
+                client.configuration.access_token = self.access_token
+
+            return param_serialize(*args, **kwargs)
+
+        def authorized_call_api(
+            method: str,
+            url: str,
+            header_params: dict[str, str] | None = None,
+            *args: Any,
+            **kwargs: Any
+        ):
+            response = call_api(method, url, header_params, *args, **kwargs)
+            if response.status != 401:
+                return response
+
+            response.read()
+
+            rejected = (header_params or {}).get('Authorization', '').removeprefix('Bearer ') or None
+
+            header_params = dict(header_params or {})
+            header_params['Authorization'] = f'Bearer {self.refresh(rejected)}'
+
+            return call_api(method, url, header_params, *args, **kwargs)
+
+        client.param_serialize = authorized_param_serialize
+        client.call_api = authorized_call_api
@@ -0,0 +1,174 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+class Page:
+    def __init__(
+        self,
+        offset: int,
+        since: str | None,
+        data: list[Any],
+        next_offset: int,
+        next_since: str | None,
+        total: int | None = None
+    ):
+        self.offset = offset
+        self.since = since
+        self.data = data
+        self.total = total
+
+        # Where to resume once this page is done
+        self.next_offset = next_offset
+        self.next_since = next_since
+
+class Paginator:
+    def __init__(
+        self,
+        __fetch: Callable[..., Any],
+        *args: Any,
+        limit: int = 10,
+        offset: int = 0,
+        since: str | None = None,
+        cursor: str | None = None,
+        cursor_field: str | None = None,
+        paging: str = 'offset',
+        max_offset: int | None = 10000,
+        read_ahead: bool = True,
+        **kwargs: Any
+    ):
+        self.fetch = __fetch
+        self.args = args
+        self.kwargs = kwargs
+
+        self.limit = limit
+        self.offset = offset
+        self.since = since
+
+        # Keyword of the fetch taking the since timestamp and entity attribute it follows
+        self.cursor = cursor
+        self.cursor_field = cursor_field
+
+        # offset, page, or cursor which restarts from the last item's timestamp after every page
+        self.paging = paging
+        self.max_offset = max_offset if paging in ('offset', 'cursor') else None
+
+        self.read_ahead = read_ahead
+
+        # Set once a listing had to stop at the offset cap with items left
+        self.truncated = False
+
+    def __iter__(self) -> Iterator[Any]:
+        for page in self.pages():
+            yield from page.data
+
+    def request(self, offset: int, since: str | None):
+        kwargs = dict(self.kwargs)
+
+        if self.paging == 'page':
+            kwargs['page'] = offset // self.limit + 1
+        else:
+            kwargs['offset'] = offset
+
+        if self.cursor and since:
+            kwargs[self.cursor] = since
+
+        return self.fetch(*self.args, limit=self.limit, **kwargs)
+
+    def header(self, response: Any, name: str) -> int | None:
+        headers = getattr(response, 'headers', None)
+        if headers:
+            for k, v in headers.items():
+                if k.lower() == name:
+                    return int(v)
+
+        return None
+
+    def total(self, response: Any) -> int | None:
+        total = getattr(response, 'total', None)
+        if total is not None:
+            return total
+
+        return self.header(response, 'x-total-count')
+
+    def timestamp(self, item: Any) -> str | None:
+        if not self.cursor_field:
+            return None
+
+        value = getattr(getattr(item, 'attributes', None) or item, self.cursor_field, None)
+        if not value:
+            return None
+
+        return datetime.fromisoformat(value).astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+    def pages(self) -> Iterator[Page]:
+        executor = ThreadPoolExecutor(1) if self.read_ahead else None
+
+        def prefetch(offset: int, since: str | None) -> Future[Any] | None:
+            return executor.submit(self.request, offset, since) if executor else None
+
+        offset, since = self.offset, self.since
+
+        # Entities sharing the boundary second come back again once the cursor moves there
+        seen: set[str] = set()
+        seen_since: str | None = None
+
+        try:
+            future = prefetch(offset, since)
+            while True:
+                response = future.result() if future else self.request(offset, since)
+
+                data = list(response.data or [])
+                if not data:
+                    return
+
+                total = self.total(response)
+
+                # Servers may cap the page size, page numbers only line up with the one really served
+                limit = self.header(response, 'x-pagination-limit')
+                if self.paging == 'page' and limit and 0 < limit < self.limit:
+                    self.limit = limit
+
+                next_offset, next_since = offset + len(data), since
+                last = len(data) < self.limit if total is None else next_offset >= total
+
+                if not last and self.max_offset and next_offset + self.limit > self.max_offset:
+                    timestamp = self.timestamp(data[-1])
+                    if not self.cursor or not timestamp or timestamp == since:
+                        last = True
+
+                        self.truncated = True
+                    else:
+                        next_offset, next_since = 0, timestamp
+
+                # Offsets shift as items move behind them, only a cursor taken from the page itself holds
+                if not last and self.paging == 'cursor' and next_since == since:
+                    timestamp = self.timestamp(data[-1])
+                    if timestamp and timestamp != since:
+                        next_offset, next_since = 0, timestamp
+
+                if not last:
+                    future = prefetch(next_offset, next_since)
+
+                if seen:
+                    data = [item for item in data if getattr(item, 'id', None) not in seen]
+
+                for item in data:
+                    timestamp = self.timestamp(item)
+                    if timestamp is None:
+                        continue
+
+                    if timestamp != seen_since:
+                        seen.clear()
+                        seen_since = timestamp
+
+                    seen.add(getattr(item, 'id', None)) # type: ignore[arg-type]
+
+                yield Page(offset, since, data, next_offset, next_since, total)
+
+                if last:
+                    return
+
+                offset, since = next_offset, next_since
+        finally:
+            if executor:
+                executor.shutdown(wait=False, cancel_futures=True)
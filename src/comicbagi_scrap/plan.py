@@ -0,0 +1,105 @@
+import os
+import json
+from datetime import datetime
+from typing import Any
+
+class Plan:
+    def __init__(self):
+        # New comics are resolved through ComicKing when written, so they are keyed by MangaDex ID
+        self.comics: dict[str, dict[str, Any]] = {}
+        self.links: dict[str, tuple[str, str]] = {}
+        self.comic_providers: dict[tuple[str, str, str], dict[str, Any]] = {}
+        self.comic_chapters: dict[tuple[str, int | float], dict[str, Any]] = {}
+        self.comic_chapter_providers: dict[tuple[str, str, str, str], dict[str, Any]] = {}
+
+        # What the write phase needs to replay new comics, never serialized
+        self.mangas: dict[str, Any] = {}
+        self.chapters: dict[str, list[Any]] = {}
+
+    def __len__(self):
+        return (
+            len(self.comics) +
+            len(self.links) +
+            len(self.comic_providers) +
+            len(self.comic_chapters) +
+            len(self.comic_chapter_providers)
+        )
+
+    def add_comic(self, manga: Any, mal_id: int, chapters: list[Any]):
+        self.comics[manga.id] = {'manga': manga.id, 'mal': mal_id, 'chapters': len(chapters)}
+
+        self.mangas[manga.id] = manga
+        self.chapters[manga.id] = chapters
+
+    def add_link(self, website_host: str, relative_reference: str):
+        self.links.setdefault(f'{website_host}{relative_reference}', (website_host, relative_reference))
+
+    def add_comic_provider(
+        self,
+        comic_code: str,
+        link_website_host: str,
+        link_relative_reference: str,
+        language_lang: str,
+        released_at: datetime
+    ):
+        self.comic_providers.setdefault(
+            (comic_code, f'{link_website_host}{link_relative_reference}', language_lang),
+            {
+                'comic': comic_code,
+                'link_website_host': link_website_host,
+                'link_relative_reference': link_relative_reference,
+                'language': language_lang,
+                'released_at': released_at
+            }
+        )
+
+    def add_comic_chapter(self, comic_code: str, number: int | float):
+        self.comic_chapters.setdefault((comic_code, number), {'comic': comic_code, 'number': number})
+
+    def add_comic_chapter_provider(
+        self,
+        comic_code: str,
+        chapter_nv: str,
+        link_website_host: str,
+        link_relative_reference: str,
+        language_lang: str,
+        released_at: datetime
+    ):
+        self.comic_chapter_providers.setdefault(
+            (comic_code, chapter_nv, f'{link_website_host}{link_relative_reference}', language_lang),
+            {
+                'comic': comic_code,
+                'chapter': chapter_nv,
+                'link_website_host': link_website_host,
+                'link_relative_reference': link_relative_reference,
+                'language': language_lang,
+                'released_at': released_at
+            }
+        )
+
+    def summary(self):
+        return {
+            'comics': len(self.comics),
+            'links': len(self.links),
+            'comic_providers': len(self.comic_providers),
+            'comic_chapters': len(self.comic_chapters),
+            'comic_chapter_providers': len(self.comic_chapter_providers)
+        }
+
+    def dump(self, path: str):
+        def entry(values: dict[str, Any]):
+            return {k: v.isoformat() if isinstance(v, datetime) else v for k, v in values.items()}
+
+        data = {
+            'summary': self.summary(),
+            'comics': list(self.comics.values()),
+            'links': list(self.links),
+            'comic_providers': [entry(v) for v in self.comic_providers.values()],
+            'comic_chapters': list(self.comic_chapters.values()),
+            'comic_chapter_providers': [entry(v) for v in self.comic_chapter_providers.values()]
+        }
+
+        with open(f'{path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+
+        os.replace(f'{path}.tmp', path)
@@ -0,0 +1,214 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Any, Mapping
+from urllib.parse import urlparse
+
+class RateBudget:
+    def __init__(self, path: str):
+        self.path = path
+
+    @contextmanager
+    def shared(self, host: str, limit: 'RateLimit'):
+        import fcntl
+
+        with open(self.path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                data: dict[str, list[float]] = json.loads(f.read() or '{}')
+
+                # The monotonic clock is system wide, so processes on one box agree on it
+                if host in data:
+                    limit.tokens, limit.updated, limit.blocked_until, limit.rate = data[host]
+
+                yield
+
+                data[host] = [limit.tokens, limit.updated, limit.blocked_until, limit.rate]
+
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(data))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+class RateLimit:
+    def __init__(
+        self,
+        rate: float,
+        burst: float | None = None,
+        concurrency: int | None = None,
+        budget: RateBudget | None = None,
+        host: str = ''
+    ):
+        self.rate_max = rate
+        self.rate = rate
+        self.burst = burst or max(1.0, rate)
+
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+        self.slept = 0.0
+
+        self.lock = threading.Lock()
+        self.semaphore = threading.BoundedSemaphore(concurrency) if concurrency else None
+
+        # Other processes drawing from the same tokens, concurrency stays per process
+        self.budget = budget
+        self.host = host
+
+    @contextmanager
+    def __locked(self):
+        with self.lock:
+            if not self.budget:
+                yield
+                return
+
+            with self.budget.shared(self.host, self):
+                yield
+
+    def acquire(self):
+        with self.__locked():
+            now = time.monotonic()
+
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # Reserve the token right away so concurrent callers queue up behind it
+            self.tokens -= 1
+
+            wait = max(0.0, self.blocked_until - now)
+            if self.tokens < 0:
+                wait = max(wait, -self.tokens / self.rate)
+
+            self.slept += wait
+
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
+
+    def block(self, seconds: float):
+        with self.__locked():
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update(self, status: int, headers: Mapping[str, Any] | None = None):
+        retry_after = None
+        remaining = None
+
+        if headers:
+            for k, v in headers.items():
+                match k.lower():
+                    case 'retry-after':
+                        retry_after = self.__retry_after(v, False)
+                    case 'x-ratelimit-retry-after':
+                        retry_after = self.__retry_after(v, True) if retry_after is None else retry_after
+                    case 'x-ratelimit-remaining':
+                        try:
+                            remaining = int(v)
+                        except ValueError:
+                            pass
+
+        if status == 429 or status >= 500:
+            with self.__locked():
+                self.rate = max(self.rate_max / 16, self.rate / 2)
+                self.tokens = min(self.tokens, 0.0)
+
+            self.block(retry_after if retry_after is not None else 1 / self.rate)
+
+            return True
+
+        with self.__locked():
+            self.rate = min(self.rate_max, self.rate + self.rate_max / 20)
+
+        if remaining is not None and remaining < 1 and retry_after is not None:
+            self.block(retry_after)
+
+        return False
+
+    def __retry_after(self, value: str, timestamp: bool):
+        try:
+            seconds = float(value)
+            return max(0.0, seconds - time.time() if timestamp else seconds)
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+class RateLimiter:
+    def __init__(
+        self,
+        rate: float = 1,
+        burst: float | None = None,
+        retries: int = 3,
+        budget_path: str | None = None
+    ):
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+
+        self.budget = RateBudget(budget_path) if budget_path else None
+
+        self.limits: dict[str, RateLimit] = {}
+
+        self.lock = threading.Lock()
+
+    def add(
+        self,
+        host: str,
+        rate: float,
+        burst: float | None = None,
+        concurrency: int | None = None
+    ):
+        with self.lock:
+            self.limits[host] = RateLimit(rate, burst, concurrency, self.budget, host)
+
+            return self.limits[host]
+
+    def get(self, host: str):
+        with self.lock:
+            if host not in self.limits:
+                self.limits[host] = RateLimit(self.rate, self.burst, None, self.budget, host)
+
+            return self.limits[host]
+
+    def slept(self):
+        return sum(limit.slept for limit in self.limits.values())
+
+    def install(self, client: Any):
+        limit = self.get(urlparse(client.configuration.host).netloc)
+
+        call_api = client.call_api
+
+        def limited_call_api(method: str, url: str, *args: Any, **kwargs: Any):
+            attempt = 0
+            while True:
+                limit.acquire()
+
+                if limit.semaphore:
+                    with limit.semaphore:
+                        response = call_api(method, url, *args, **kwargs)
+                else:
+                    response = call_api(method, url, *args, **kwargs)
+
+                retry = limit.update(response.status, response.getheaders())
+                if not retry or attempt >= self.retries:
+                    return response
+
+                # Writes are only replayed when the server refused them outright
+                if response.status != 429 and method.upper() != 'GET':
+                    return response
+
+                response.read()
+                attempt += 1
+
+        client.call_api = limited_call_api
+
+        return limit
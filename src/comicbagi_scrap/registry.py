@@ -0,0 +1,150 @@
+import sys
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, Iterable, Iterator, TypeVar
+
+T = TypeVar('T', bound=Hashable)
+
+class Registry(Generic[T]):
+    def __init__(self, maxsize: int | None = None):
+        self.maxsize = maxsize
+
+        self.items: OrderedDict[T, None] = OrderedDict()
+
+        self.lock = threading.Lock()
+
+    def __contains__(self, item: object):
+        with self.lock:
+            if item not in self.items:
+                return False
+
+            if self.maxsize:
+                self.items.move_to_end(item) # type: ignore[arg-type]
+
+            return True
+
+    def __iter__(self) -> Iterator[T]:
+        with self.lock:
+            return iter(list(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item: T):
+        with self.lock:
+            if item in self.items:
+                if self.maxsize:
+                    self.items.move_to_end(item)
+                return
+
+            self.items[item] = None
+
+            if self.maxsize and len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def discard(self, item: T):
+        with self.lock:
+            self.items.pop(item, None)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+class ComicChapterRegistry(Registry[tuple[str, int | float, str | None]]):
+    def key(self, comic_code: str, number: int | float, version: str | None = None):
+        return (sys.intern(comic_code), number, version or None)
+
+    def has(self, comic_code: str, number: int | float, version: str | None = None):
+        return self.key(comic_code, number, version) in self
+
+    def put(self, comic_code: str, number: int | float, version: str | None = None):
+        self.add(self.key(comic_code, number, version))
+
+class LinkIndex:
+    def __init__(self):
+        self.hosts: set[str] = set()
+
+        # Sorted 16 byte UUIDs packed back to back per host and kind, e.g. mangadex.org /chapter/
+        self.uuids: dict[tuple[str, str], bytes] = {}
+        self.others: set[str] = set()
+        self.added: set[tuple[str, str, bytes] | str] = set()
+
+        self.lock = threading.Lock()
+
+    def key(self, href: str) -> tuple[str, str, bytes] | str:
+        host, _, relative_reference = href.partition('/')
+        kind, _, id = relative_reference.partition('/')
+
+        if len(id) != 36:
+            return href
+
+        try:
+            return (host, kind, uuid.UUID(id).bytes)
+        except ValueError:
+            return href
+
+    def load(self, website_host: str, hrefs: Iterable[str]):
+        packed: dict[tuple[str, str], list[bytes]] = {}
+        others: set[str] = set()
+
+        for href in hrefs:
+            key = self.key(href)
+            if isinstance(key, str):
+                others.add(key)
+            else:
+                packed.setdefault(key[:2], []).append(key[2])
+
+        with self.lock:
+            for k, v in packed.items():
+                v.sort()
+                self.uuids[k] = b''.join(v)
+
+            self.others |= others
+            self.hosts.add(website_host)
+
+    def forget(self, website_host: str):
+        with self.lock:
+            self.hosts.discard(website_host)
+
+            for k in [k for k in self.uuids if k[0] == website_host]:
+                del self.uuids[k]
+
+    def covers(self, href: str):
+        return href.partition('/')[0] in self.hosts
+
+    def __contains__(self, href: object):
+        if not isinstance(href, str):
+            return False
+
+        key = self.key(href)
+
+        with self.lock:
+            if key in self.added:
+                return True
+
+            if isinstance(key, str):
+                return key in self.others
+
+            packed = self.uuids.get(key[:2])
+
+        if not packed:
+            return False
+
+        low, high = 0, len(packed) // 16
+        while low < high:
+            middle = (low + high) // 2
+            if packed[middle*16:middle*16+16] < key[2]:
+                low = middle + 1
+            else:
+                high = middle
+
+        return packed[low*16:low*16+16] == key[2]
+
+    def __len__(self):
+        with self.lock:
+            return sum(len(v) // 16 for v in self.uuids.values()) + len(self.others) + len(self.added)
+
+    def add(self, href: str):
+        with self.lock:
+            self.added.add(self.key(href))
@@ -0,0 +1,68 @@
+import socket
+import urllib3
+from typing import Any
+from urllib3.connection import HTTPConnection
+
+class Transport:
+    def __init__(
+        self,
+        pool_maxsize: int = 10,
+        timeout: float = 30,
+        connect_timeout: float = 10,
+        keepalive: bool = True,
+        compression: bool = True
+    ):
+        self.timeout = urllib3.Timeout(connect=connect_timeout, read=timeout)
+        self.keepalive = keepalive
+        self.compression = compression
+
+        socket_options = list(HTTPConnection.default_socket_options)
+        if keepalive:
+            socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+
+        # Without keepalive every request gets a fresh connection, the server closes it after answering
+        headers = {}
+        if not keepalive:
+            headers['Connection'] = 'close'
+        if compression:
+            headers['Accept-Encoding'] = 'gzip, deflate'
+
+        pool_kwargs: dict[str, Any] = {}
+        try:
+            import certifi
+
+            pool_kwargs['cert_reqs'] = 'CERT_REQUIRED'
+            pool_kwargs['ca_certs'] = certifi.where()
+        except ImportError:
+            pass
+
+        # One pool per host, every client of this process shares them
+        self.pool_manager = urllib3.PoolManager(
+            maxsize=pool_maxsize,
+            timeout=self.timeout,
+            socket_options=socket_options,
+            headers=headers,
+            **pool_kwargs
+        )
+
+    def request(self, method: str, url: str, **kwargs: Any):
+        return self.pool_manager.request(method, url, **kwargs)
+
+    def install(self, client: Any):
+        client.rest_client.pool_manager = self.pool_manager
+
+        if not self.keepalive:
+            client.set_default_header('Connection', 'close')
+        if self.compression:
+            client.set_default_header('Accept-Encoding', 'gzip, deflate')
+
+        call_api = client.call_api
+
+        # The generated clients pass their own timeout, which would override the pool one
+        def timed_call_api(*args: Any, **kwargs: Any):
+            if not kwargs.get('_request_timeout'):
+                kwargs['_request_timeout'] = (self.timeout.connect_timeout, self.timeout.read_timeout)
+
+            return call_api(*args, **kwargs)
+
+        client.call_api = timed_call_api